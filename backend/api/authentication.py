@@ -0,0 +1,158 @@
+import copy
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.permissions import SAFE_METHODS
+
+from users.models import User
+
+
+class TokenCache:
+    '''
+    LRU ключ -> токен с пользователем в памяти процесса. Запись живёт ttl
+    секунд: удаление токена в другом воркере она переживёт не дольше.
+    '''
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires, token = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return token
+
+    def set(self, key, token):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, token)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def delete_user(self, pk):
+        with self.lock:
+            for key in [
+                key for key, (_, token) in self.entries.items()
+                if token.user_id == pk
+            ]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+tokens = TokenCache(
+    settings.AUTH_TOKEN_LOCAL_SIZE, settings.AUTH_TOKEN_LOCAL_TTL
+)
+
+
+def shared_cache():
+    if settings.AUTH_TOKEN_CACHE:
+        return caches[settings.AUTH_TOKEN_CACHE]
+    return None
+
+
+def shared_key(key):
+    return f'auth-token:{key}'
+
+
+def forget(key):
+    tokens.delete(key)
+    cache = shared_cache()
+    if cache is not None:
+        cache.delete(shared_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    '''
+    TokenAuthentication без запроса Token + User на каждый вызов API:
+    пользователь ищется в LRU процесса, затем в общем кэше
+    AUTH_TOKEN_CACHE, если он задан, и только потом в базе. В общем
+    кэше хранятся только id и is_active пользователя.
+    Изменяющие запросы читают пользователя из базы: его полный save()
+    не должен записать устаревшие счётчики из кэша.
+    '''
+
+    cached = True
+
+    def authenticate(self, request):
+        self.cached = request.method in SAFE_METHODS
+        return super().authenticate(request)
+
+    def authenticate_credentials(self, key):
+        token = tokens.get(key) if self.cached else None
+        if token is None:
+            token = self.shared_token(key)
+            tokens.set(key, token)
+        # Копия, чтобы запрос не менял пользователя в общем LRU
+        return (copy.copy(token.user), token)
+
+    def shared_token(self, key):
+        cache = shared_cache()
+        if cache is not None and self.cached:
+            entry = cache.get(shared_key(key))
+            if entry is not None:
+                return self.rebuild(key, *entry)
+        token = super().authenticate_credentials(key)[1]
+        if cache is not None:
+            cache.set(
+                shared_key(key), (token.user_id, token.user.is_active),
+                settings.AUTH_TOKEN_SHARED_TTL
+            )
+        return token
+
+    def rebuild(self, key, user_id, is_active):
+        '''
+        Токен из записи общего кэша. В кэше лежат только id и is_active,
+        а не пользователь целиком с хэшем пароля: остальные поля
+        читаются из базы при первом обращении к ним
+        '''
+        if not is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        user = User.from_db(None, ('id', 'is_active'), (user_id, is_active))
+        return Token(key=key, user=user)
+
+
+@receiver(post_delete, sender=Token)
+def forget_token(instance, **kwargs):
+    forget(instance.key)
+
+
+@receiver(post_save, sender=User)
+def forget_user(instance, created, update_fields=None, **kwargs):
+    '''Смена пароля, активности и профиля должна быть видна сразу'''
+    if created or update_fields is not None and set(update_fields) == {
+        'last_login'
+    }:
+        return
+    tokens.delete_user(instance.pk)
+    if shared_cache() is not None:
+        for key in Token.objects.filter(user=instance).values_list(
+            'key', flat=True
+        ):
+            forget(key)
@@ -0,0 +1,68 @@
+from bisect import bisect_left
+
+from django.db import connection
+
+from foodgram import reference
+from foodgram.models import Ingredients
+
+
+class IngredientsIndex:
+    '''
+    Отсортированный в памяти список ингредиентов для баз без
+    префиксных индексов по UPPER(name), то есть для SQLite.
+    Перестраивается при смене версии справочника ингредиентов.
+    '''
+
+    def __init__(self):
+        self.state = (None, [])
+
+    def get_entries(self):
+        source, entries = self.state
+        objects = reference.ingredients.all()
+        if objects is not source:
+            entries = sorted(
+                (obj.name.casefold(), obj.pk, obj) for obj in objects.values()
+            )
+            self.state = (objects, entries)
+        return entries
+
+    def search(self, query, limit=None):
+        entries = self.get_entries()
+        query = query.casefold()
+        start = bisect_left(entries, (query,))
+        end = start
+        while end < len(entries) and entries[end][0].startswith(query):
+            end += 1
+        found = entries[start:end]
+        if limit is None or len(found) < limit:
+            found += [
+                entry for entry in entries[:start] + entries[end:]
+                if query in entry[0]
+            ]
+        return [obj for _, _, obj in found[:limit]]
+
+
+index = IngredientsIndex()
+
+
+def search_database(query, limit=None):
+    '''
+    Сначала совпадения по началу названия, затем по вхождению.
+    Оба запроса опираются на индексы по UPPER(name) из миграции
+    foodgram 0007: text_pattern_ops и pg_trgm.
+    '''
+    found = list(
+        Ingredients.objects.filter(name__istartswith=query)
+        .order_by('name')[:limit]
+    )
+    if limit is None or len(found) < limit:
+        found += Ingredients.objects.filter(name__icontains=query).exclude(
+            name__istartswith=query
+        ).order_by('name')[:None if limit is None else limit - len(found)]
+    return found
+
+
+def autocomplete(query, limit=None):
+    if connection.vendor == 'postgresql':
+        return search_database(query, limit)
+    return index.search(query, limit)
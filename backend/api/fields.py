@@ -0,0 +1,121 @@
+import base64
+import binascii
+import tempfile
+import uuid
+
+from django.conf import settings
+from django.core.files import File
+from PIL import Image
+from rest_framework import serializers
+
+BASE64_CHUNK_SIZE = 64 * 1024
+IMAGE_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    '''PrimaryKeyRelatedField, проверяющий pk по справочнику в кэше'''
+
+    def __init__(self, reference, **kwargs):
+        self.reference = reference
+        kwargs.setdefault('queryset', reference.model.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            obj = self.reference.get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
+
+
+class ThumbnailField(serializers.ImageField):
+    '''Ссылка на миниатюру изображения, а пока её нет — на оригинал'''
+
+    def __init__(self, **kwargs):
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        return instance.thumbnail or instance.image
+
+
+class StreamingBase64ImageField(serializers.ImageField):
+    '''
+    Изображение в base64 (data URI или голая строка). Размер файла
+    проверяется по длине строки ещё до декодирования, строка
+    декодируется кусками во временный файл (крупный — на диске),
+    а размеры картинки читаются из заголовка без распаковки пикселей.
+    '''
+
+    default_error_messages = {
+        'invalid_base64': 'Изображение должно быть строкой base64.',
+        'too_large': 'Размер изображения больше {max_bytes} байт.',
+        'too_big': (
+            'Изображение больше {max_side} точек по стороне '
+            'или {max_pixels} точек всего.'
+        ),
+        'invalid_type': 'Допустимые форматы: JPEG, PNG, GIF, WebP.',
+    }
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid_base64')
+        start = data.find(',') + 1
+        if start and not data[:start].endswith(';base64,'):
+            self.fail('invalid_base64')
+        size = (len(data) - start) * 3 // 4 - data[-2:].count('=')
+        if size > settings.IMAGE_MAX_BYTES:
+            self.fail('too_large', max_bytes=settings.IMAGE_MAX_BYTES)
+        file = File(tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE,
+            dir=settings.FILE_UPLOAD_TEMP_DIR
+        ))
+        try:
+            self.decode(data, start, file)
+            file.name = f'{uuid.uuid4()}.{self.check_image(file)}'
+        except Exception:
+            file.close()
+            raise
+        return file
+
+    def decode(self, data, start, file):
+        '''Срезы по BASE64_CHUNK_SIZE: вся строка не копируется'''
+        try:
+            for start in range(start, len(data), BASE64_CHUNK_SIZE):
+                file.write(base64.b64decode(
+                    data[start:start + BASE64_CHUNK_SIZE], validate=True
+                ))
+        except (binascii.Error, ValueError):
+            self.fail('invalid_base64')
+        file.seek(0)
+
+    def check_image(self, file):
+        '''Проверяет заголовок и целостность файла, возвращает расширение'''
+        try:
+            with Image.open(file) as image:
+                width, height = image.size
+                format = image.format
+                too_big = (
+                    max(width, height) > settings.IMAGE_MAX_SIDE
+                    or width * height > settings.IMAGE_MAX_PIXELS
+                )
+                if not too_big:
+                    image.verify()
+        except Image.DecompressionBombError:
+            too_big = True
+        except Exception:
+            self.fail('invalid_image')
+        if too_big:
+            self.fail(
+                'too_big', max_side=settings.IMAGE_MAX_SIDE,
+                max_pixels=settings.IMAGE_MAX_PIXELS
+            )
+        if format not in IMAGE_EXTENSIONS:
+            self.fail('invalid_type')
+        file.seek(0)
+        file.content_type = Image.MIME[format]
+        return IMAGE_EXTENSIONS[format]
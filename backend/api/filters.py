@@ -1,35 +1,115 @@
 import django_filters
+from django import forms
+from django.db.models import (Count, Exists, ExpressionWrapper, F, FloatField,
+                              IntegerField, OuterRef)
+from django.db.models.functions import Cast, Greatest
 from django_filters import FilterSet
 
-from foodgram.models import Recipes, Tags
+from foodgram import reference, search
+from foodgram.models import Favorites, Recipes, RecipeTags, ShopLists
+
+
+class SlugsField(forms.MultipleChoiceField):
+    '''Список слагов без сверки с вариантами выбора'''
+
+    def valid_value(self, value):
+        return True
+
+
+class SlugsFilter(django_filters.MultipleChoiceFilter):
+    field_class = SlugsField
 
 
 class RecipesFilterSet(FilterSet):
     author = django_filters.CharFilter(
         field_name='author__id'
     )
-    tags = django_filters.ModelMultipleChoiceFilter(
-        queryset=Tags.objects.all(), field_name='tags__slug',
-        to_field_name='slug'
+    tags = SlugsFilter(method='filter_tags')
+    is_favorited = django_filters.NumberFilter(method='filter_relation')
+    is_in_shopping_cart = django_filters.NumberFilter(
+        method='filter_relation'
+    )
+
+    search = django_filters.CharFilter(method='filter_search')
+    ordering = django_filters.ChoiceFilter(
+        choices=(('popular', 'popular'),), method='filter_ordering'
     )
 
+    relations = {
+        'is_favorited': Favorites,
+        'is_in_shopping_cart': ShopLists,
+    }
+    orderings = {
+        'popular': ('-popularity', '-pk'),
+    }
+
     class Meta:
         model = Recipes
         fields = ('author', 'tags')
 
-    @property
-    def qs(self):
-        qs = super().qs
+    def filter_tags(self, queryset, name, value):
+        '''
+        Рецепты хотя бы с одним из тэгов: EXISTS по индексу
+        (recipe, tag) вместо JOIN, который дублирует строки.
+        Слаги переводятся в id по кэшу справочника тэгов.
+        '''
+        tags = [
+            tag.pk for tag in reference.tags.all().values()
+            if tag.slug in value
+        ]
+        return queryset.annotate(has_tags=Exists(
+            RecipeTags.objects.filter(recipe=OuterRef('pk'), tag__in=tags)
+        )).filter(has_tags=True)
+
+    def filter_relation(self, queryset, name, value):
+        '''
+        Рецепты из избранного или корзины пользователя: EXISTS
+        по индексу (user, recipe). Аноним таких рецептов не имеет.
+        '''
+        if value != 1:
+            return queryset
         user = self.request.user
-        params = self.request.query_params
-        if params.get('is_favorited') == '1':
-            qs = qs.filter(id__in=user.favorites.all().values('recipe'))
-        if params.get('is_in_shopping_cart') == '1':
-            qs = qs.filter(id__in=user.shoplist.all().values('recipe'))
-        return qs
+        if not user.is_authenticated:
+            return queryset.none()
+        return queryset.annotate(**{f'{name}_filter': Exists(
+            self.relations[name].objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )
+        )}).filter(**{f'{name}_filter': True})
 
+    def filter_ordering(self, queryset, name, value):
+        '''
+        popular — по счёту из compute_popularity, который хранится
+        в индексированном столбце: таблицы связей при запросе не читаются
+        '''
+        return queryset.order_by(*self.orderings[value])
 
-class IngredientsFilterSet(FilterSet):
-    name = django_filters.CharFilter(
-        field_name='name', lookup_expr='startswith'
-    )
+    def filter_search(self, queryset, name, value):
+        '''По названию, описанию и ингредиентам, см. foodgram.search'''
+        return search.search(queryset, value)
+
+
+def rank_by_ingredients(queryset, ingredient_ids):
+    '''
+    Рецепты хотя бы с одним из ингредиентов, по убыванию доли
+    ингредиентов рецепта, которые есть у пользователя. Читаются только
+    строки RecipeIngredients этих ингредиентов: индекс (ingredient,
+    recipe) служит инвертированным индексом, а число ингредиентов
+    рецепта берётся из счётчика Recipes.ingredients_count.
+    '''
+    return queryset.filter(
+        recipeingredients__ingredient__in=ingredient_ids
+    ).annotate(
+        matched=Count('pk'),
+        total=Greatest(
+            'ingredients_count', 'matched', output_field=IntegerField()
+        ),
+    ).annotate(
+        missing=ExpressionWrapper(
+            F('total') - F('matched'), output_field=IntegerField()
+        ),
+        coverage=ExpressionWrapper(
+            Cast('matched', FloatField()) / F('total'),
+            output_field=FloatField()
+        ),
+    ).order_by('-coverage', 'missing', '-pk')
@@ -1,7 +1,18 @@
+import hashlib
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 from rest_framework import mixins, permissions, status, views, viewsets
 from rest_framework.response import Response
 
+from foodgram.reference import relations_version
+
+User = get_user_model()
+
 
 class LookCreate(
     mixins.CreateModelMixin, mixins.RetrieveModelMixin,
@@ -17,15 +28,95 @@ class ListRetrieve(
     pass
 
 
+class ConditionalMixin:
+    '''
+    Условные GET: если ETag или Last-Modified клиента актуальны,
+    отвечает 304 Not Modified, не выполняя сериализацию.
+    Вьюха описывает состояние ответа в get_etag_parts/get_last_modified.
+    '''
+
+    def get_etag_parts(self):
+        return ()
+
+    def get_last_modified(self):
+        return None
+
+    def get_validators(self):
+        parts = self.get_etag_parts()
+        etag = None
+        if parts:
+            etag = quote_etag(hashlib.md5(
+                ':'.join(map(str, parts)).encode()
+            ).hexdigest())
+        last_modified = self.get_last_modified()
+        if last_modified is not None:
+            last_modified = int(last_modified.timestamp())
+        return etag, last_modified
+
+    def set_validators(self, response, etag, last_modified):
+        if etag is not None:
+            response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def conditional(self, handler, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+        return self.set_validators(response, etag, last_modified)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(super().retrieve, request, *args, **kwargs)
+
+
+class CachedListRetrieve(ConditionalMixin, ListRetrieve):
+    '''
+    Справочник, который отдаётся из ReferenceData без запросов к БД
+    '''
+
+    reference = None
+
+    def get_etag_parts(self):
+        return (self.reference.key, self.reference.version.get())
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(self.list_reference, request)
+
+    def list_reference(self, request):
+        return Response(self.get_serializer(
+            self.reference.all().values(), many=True
+        ).data)
+
+    def get_object(self):
+        try:
+            obj = self.reference.get(int(self.kwargs['pk']))
+        except ValueError:
+            obj = None
+        if obj is None:
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+
 class ListView(
     mixins.ListModelMixin, viewsets.GenericViewSet
 ):
     pass
 
 
-class CreateDestroyView(views.APIView):
+class RelationView(views.APIView):
     '''
-    Вьюха для создания и удаления простых связей между объектом
+    Общая часть вьюх для связей между объектом
     и авторизованным пользователем
     '''
 
@@ -33,15 +124,52 @@ class CreateDestroyView(views.APIView):
     model = None
     object_model = None
     user_field = None
-    fail_message = None
+    object_field = None
+    counter = None
     permission_classes = [permissions.IsAuthenticated, ]
 
     def user(self):
         return self.request.user
 
+    def get_second_queryset(self):
+        '''Только столбцы, которые выводит representation_class'''
+        fields = self.representation_class.Meta.fields
+        return self.object_model.objects.only(*(
+            field.name for field in self.object_model._meta.concrete_fields
+            if field.name in fields
+        ))
+
+    def context(self):
+        return {'request': self.request}
+
+    def lock_user(self):
+        '''
+        Изменения связей одного пользователя, одиночные и пакетные,
+        идут по очереди: пакет сдвигает счётчики по списку id,
+        прочитанному до вставки, и не должен пересечься с одиночным
+        запросом на ту же связь
+        '''
+        list(User.objects.select_for_update().filter(pk=self.user().pk))
+
+    def count(self, ids, delta):
+        '''Сдвигает счётчик связей у объектов, если он задан'''
+        if self.counter is not None:
+            self.counter(ids, delta)
+
+
+class CreateDestroyView(RelationView):
+    '''
+    Вьюха для создания и удаления простых связей между объектом
+    и авторизованным пользователем. Связь добавляется одним
+    INSERT ... ON CONFLICT DO NOTHING и удаляется одним DELETE,
+    сам объект читается только для ответа на создание.
+    '''
+
+    fail_message = None
+
     def get_second_object(self):
         return get_object_or_404(
-            self.object_model, pk=self.kwargs.get('pk')
+            self.get_second_queryset(), pk=self.kwargs.get('pk')
         )
 
     def get_model(self):
@@ -50,32 +178,130 @@ class CreateDestroyView(views.APIView):
     def data(self):
         return {
             self.user_field: self.user(),
-            self.object_field: self.get_second_object()
+            f'{self.object_field}_id': self.kwargs.get('pk')
         }
 
-    def context(self):
-        return {'request': self.request}
+    @transaction.atomic
+    def perform_create(self, data):
+        self.lock_user()
+        created = self.model.objects.insert_ignore(**data)
+        if created:
+            self.count([self.kwargs.get('pk')], 1)
+            relations_version(self.user()).bump()
+        return created
+
+    @transaction.atomic
+    def perform_destroy(self, data):
+        self.lock_user()
+        deleted = self.model.objects.filter(**data).raw_delete()
+        if deleted:
+            self.count([self.kwargs.get('pk')], -1)
+            relations_version(self.user()).bump()
+        return deleted
 
     def delete(self, request, pk):
-        try:
-            object = self.model.objects.get(**self.data())
-            object.delete()
+        if self.perform_destroy(self.data()):
             return Response(status=status.HTTP_204_NO_CONTENT)
-        except self.model.DoesNotExist:
-            return Response(
-                self.fail_message, status=status.HTTP_400_BAD_REQUEST
-            )
+        if not self.object_model.objects.filter(pk=pk).exists():
+            raise Http404
+        return Response(
+            self.fail_message, status=status.HTTP_400_BAD_REQUEST
+        )
 
     def post(self, request, pk):
-        object, created = self.model.objects.get_or_create(**self.data())
-        if not created:
+        object = self.get_second_object()
+        if not self.perform_create(self.data()):
             return Response(
                 'Такая связь уже существует',
                 status=status.HTTP_400_BAD_REQUEST
             )
         return Response(
-            self.representation_class(
-                self.get_second_object(), context=self.context()
-            ).data,
+            self.representation_class(object, context=self.context()).data,
             status=status.HTTP_201_CREATED
         )
+
+
+class BulkCreateDestroyView(RelationView):
+    '''
+    Пакетное добавление и удаление связей: все изменения идут
+    одной транзакцией массовыми запросами, в ответе результат
+    по каждому переданному id
+    '''
+
+    input_class = None
+
+    def get_ids(self):
+        serializer = self.input_class(data=self.request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data['ids']
+
+    def relations(self, ids):
+        return self.model.objects.filter(**{
+            self.user_field: self.user(), f'{self.object_field}__in': ids
+        })
+
+    def related_ids(self, ids):
+        return set(self.relations(ids).values_list(
+            f'{self.object_field}_id', flat=True
+        ))
+
+    def perform_bulk_create(self, ids):
+        self.model.objects.bulk_create((
+            self.model(**{
+                self.user_field: self.user(), f'{self.object_field}_id': pk
+            }) for pk in ids
+        ), ignore_conflicts=True)
+        self.count(ids, 1)
+
+    def perform_bulk_destroy(self, ids):
+        self.relations(ids).raw_delete()
+        self.count(ids, -1)
+
+    @transaction.atomic
+    def post(self, request):
+        ids = self.get_ids()
+        self.lock_user()
+        objects = self.get_second_queryset().in_bulk(ids)
+        related = self.related_ids(list(objects))
+        added = [pk for pk in objects if pk not in related]
+        if added:
+            self.perform_bulk_create(added)
+            relations_version(self.user()).bump()
+        results = []
+        for pk in ids:
+            if pk not in objects:
+                results.append({'id': pk, 'status': 'not_found'})
+            elif pk in related:
+                results.append({'id': pk, 'status': 'exists'})
+            else:
+                results.append({
+                    'id': pk, 'status': 'added',
+                    self.object_field: self.representation_class(
+                        objects[pk], context=self.context()
+                    ).data
+                })
+        return Response(results)
+
+    @transaction.atomic
+    def delete(self, request):
+        ids = self.get_ids()
+        self.lock_user()
+        removed = self.related_ids(ids)
+        if removed:
+            self.perform_bulk_destroy(removed)
+            relations_version(self.user()).bump()
+        unrelated = set(ids) - removed
+        found = set()
+        if unrelated:
+            found = set(self.object_model.objects.filter(
+                pk__in=unrelated
+            ).values_list('pk', flat=True))
+        return Response([
+            {
+                'id': pk,
+                'status': (
+                    'removed' if pk in removed
+                    else 'missing' if pk in found else 'not_found'
+                )
+            } for pk in ids
+        ])
@@ -1,5 +1,116 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+import operator
+from functools import reduce
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class RecipesCursorPagination(CursorPagination):
+    '''
+    Курсор по всем полям сортировки, а не только по первому, как
+    в CursorPagination: позиция — значения полей рецепта, страница
+    начинается строго после неё. Последнее поле уникально (pk),
+    поэтому одинаковые значения первых полей, например нулевая
+    популярность, не обходятся смещением.
+    '''
+
+    ordering = 'pk'
+    page_size_query_param = 'limit'
+
+    def _get_position_from_instance(self, instance, ordering):
+        return json.dumps([
+            getattr(instance, field.lstrip('-')) for field in ordering
+        ])
+
+    def after(self, position, reverse):
+        '''
+        (a, b) после (x, y): a > x OR (a = x AND b > y), с учётом
+        направления каждого поля и курсора назад
+        '''
+        try:
+            values = json.loads(position)
+            conditions = [
+                Q(**{
+                    field.lstrip('-'): value
+                    for field, value in zip(self.ordering[:index], values)
+                }, **{
+                    '{}__{}'.format(
+                        field.lstrip('-'),
+                        'lt' if field.startswith('-') != reverse else 'gt'
+                    ): values[index]
+                }) for index, field in enumerate(self.ordering)
+            ]
+        except (TypeError, ValueError, IndexError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        return reduce(operator.or_, conditions)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        '''
+        CursorPagination.paginate_queryset с условием по всем полям;
+        смещение для повторяющихся позиций не нужно и всегда 0
+        '''
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse, position = False, None
+        if self.cursor is not None:
+            reverse, position = self.cursor.reverse, self.cursor.position
+        ordering = self.ordering
+        if reverse:
+            ordering = [
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in ordering
+            ]
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.after(position, reverse))
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following = None
+        if len(results) > len(self.page):
+            following = self._get_position_from_instance(
+                results[-1], self.ordering
+            )
+        if reverse:
+            self.page.reverse()
+            following, position = position, following
+        self.has_next = following is not None
+        self.next_position = following
+        self.has_previous = position is not None
+        self.previous_position = position
+        return self.page
 
 
 class RecipesPagination(PageNumberPagination):
+    '''
+    Постраничная выдача по page/limit. С параметром cursor (для первой
+    страницы пустым) переключается на курсор по pk или по явной
+    сортировке запроса: без COUNT и OFFSET, устойчиво к добавлению
+    новых записей.
+    '''
+
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    cursor = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            return super().paginate_queryset(queryset, request, view)
+        self.cursor = RecipesCursorPagination()
+        self.cursor.page_size = self.get_page_size(request)
+        ordering = list(queryset.query.order_by)
+        if ordering:
+            if ordering[-1].lstrip('-') not in ('pk', 'id'):
+                ordering.append('pk')
+            self.cursor.ordering = ordering
+        return self.cursor.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor is not None:
+            return self.cursor.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -1,11 +1,16 @@
 from django.contrib.auth import get_user_model
-from drf_extra_fields.fields import Base64ImageField
+from django.db import transaction
 from rest_framework import serializers
 
+from api.fields import (CachedPrimaryKeyRelatedField,
+                        StreamingBase64ImageField, ThumbnailField)
+from foodgram import images, reference, search
 from foodgram.models import (Ingredients, RecipeIngredients, Recipes,
-                             RecipeTags, Tags)
+                             RecipeTags, ShopListTotals, Tags)
 from foodgram.validators import bigger_than_zero
 
+BULK_LIMIT = 100
+
 User = get_user_model()
 
 
@@ -20,11 +25,16 @@ class UserSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context['request'].user
-        return (
-            user.is_authenticated
-            and user.subscribed.filter(author=obj).exists()
-        )
+        if not user.is_authenticated:
+            return False
+        if 'subscriptions' not in self.context:
+            self.context['subscriptions'] = set(
+                user.subscribed.values_list('author', flat=True)
+            )
+        return obj.id in self.context['subscriptions']
 
 
 class TagsSerializer(serializers.ModelSerializer):
@@ -35,9 +45,7 @@ class TagsSerializer(serializers.ModelSerializer):
 
 
 class RecipeIngridientSerializer(serializers.Serializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredients.objects.all()
-    )
+    id = CachedPrimaryKeyRelatedField(reference.ingredients)
     name = serializers.CharField(source='ingredient.name', required=False)
     measuring_unit = serializers.CharField(
         source='ingredient.measuring_unit', required=False
@@ -65,11 +73,15 @@ class SubscriptionSerializer(UserSerializer):
         )
 
     def get_recipes(self, obj):
+        if hasattr(obj, 'feed_recipes'):
+            return RecipesThumbnailSerializer(
+                obj.feed_recipes, many=True
+            ).data
         limit = self.context['request'].GET.get('recipes_limit')
         queryset = obj.recipes.all()
         if limit:
             queryset = queryset[:int(limit)]
-        return RecipesForSubscribers(queryset, many=True).data
+        return RecipesThumbnailSerializer(queryset, many=True).data
 
 
 class RecipesForSubscribers(serializers.ModelSerializer):
@@ -79,9 +91,36 @@ class RecipesForSubscribers(serializers.ModelSerializer):
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
+class RecipesThumbnailSerializer(RecipesForSubscribers):
+    thumbnail = ThumbnailField()
+
+    class Meta(RecipesForSubscribers.Meta):
+        fields = RecipesForSubscribers.Meta.fields + ('thumbnail',)
+
+
+class IdsSerializer(serializers.Serializer):
+    '''
+    Непустой список id под ключом field (по умолчанию ids):
+    повторы отбрасываются, порядок первых вхождений сохраняется
+    '''
+
+    def __init__(self, *args, field='ids', **kwargs):
+        self.field = field
+        super().__init__(*args, **kwargs)
+
+    def get_fields(self):
+        return {self.field: serializers.ListField(
+            child=serializers.IntegerField(min_value=1),
+            allow_empty=False, max_length=BULK_LIMIT
+        )}
+
+    def validate(self, attrs):
+        return {self.field: list(dict.fromkeys(attrs[self.field]))}
+
+
 class RecipesSerializer(serializers.ModelSerializer):
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tags.objects.all(), many=True, required=True
+    tags = CachedPrimaryKeyRelatedField(
+        reference.tags, many=True, required=True
     )
     author = UserSerializer(read_only=True)
     ingredients = RecipeIngridientSerializer(
@@ -89,7 +128,7 @@ class RecipesSerializer(serializers.ModelSerializer):
     )
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
-    image = Base64ImageField(required=True)
+    image = StreamingBase64ImageField(required=True)
     text = serializers.CharField(required=True)
     cooking_time = serializers.IntegerField(required=True)
     name = serializers.CharField(required=True)
@@ -99,7 +138,7 @@ class RecipesSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'tags', 'author', 'ingredients', 'is_favorited',
             'is_in_shopping_cart', 'name', 'image', 'text',
-            'cooking_time'
+            'cooking_time', 'favorites_count'
         )
 
     def validate_cooking_time(self, value):
@@ -127,12 +166,16 @@ class RecipesSerializer(serializers.ModelSerializer):
         return self.context['request'].user
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         return (
             self.user().is_authenticated
             and self.user().favorites.filter(recipe=obj).exists()
         )
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         return (
             self.user().is_authenticated
             and self.user().shoplist.filter(recipe=obj).exists()
@@ -153,26 +196,123 @@ class RecipesSerializer(serializers.ModelSerializer):
         ]
         RecipeTags.objects.bulk_create(objs)
 
+    def update_tags(self, tags, recipe):
+        '''Удаляет снятые тэги и добавляет новые, не трогая остальные'''
+        old = {tag.pk for tag in recipe.tags.all()}
+        new = {tag.pk for tag in tags}
+        if old - new:
+            RecipeTags.objects.filter(
+                recipe=recipe, tag__in=old - new
+            ).delete()
+        self.create_tags([tag for tag in tags if tag.pk not in old], recipe)
+
+    def update_ingredients(self, ingredients, recipe):
+        '''
+        Сравнивает ингредиенты рецепта с присланными: изменённые
+        количества обновляются, лишние строки удаляются, новые
+        добавляются. Возвращает старые количества оставшихся
+        ингредиентов и новые: удалённые строки вычитает из корзин
+        сигнал post_delete.
+        '''
+        rows = {
+            obj.ingredient_id: obj
+            for obj in recipe.recipeingredients_set.all()
+        }
+        new_amounts = {obj['id'].pk: obj['amount'] for obj in ingredients}
+        old_amounts = {
+            pk: obj.amount for pk, obj in rows.items() if pk in new_amounts
+        }
+        removed = rows.keys() - new_amounts.keys()
+        if removed:
+            RecipeIngredients.objects.filter(
+                recipe=recipe, ingredient__in=removed
+            ).delete()
+        changed = []
+        for pk, amount in new_amounts.items():
+            if pk in rows and rows[pk].amount != amount:
+                rows[pk].amount = amount
+                changed.append(rows[pk])
+        RecipeIngredients.objects.bulk_update(changed, ['amount'])
+        self.create_ingredients([
+            obj for obj in ingredients if obj['id'].pk not in rows
+        ], recipe)
+        return old_amounts, new_amounts
+
+    @transaction.atomic
     def create(self, validated_data):
         tags = validated_data.pop('tags')
         ingredients = validated_data.pop('recipeingredients_set')
+        validated_data['search_document'] = search.document(
+            validated_data['name'], validated_data['text'],
+            [ingredient['id'].name for ingredient in ingredients]
+        )
+        validated_data['ingredients_count'] = len(ingredients)
         recipe = Recipes.objects.create(**validated_data)
         self.create_ingredients(ingredients, recipe)
         self.create_tags(tags, recipe)
+        search.index([recipe])
+        transaction.on_commit(lambda: images.schedule(recipe.pk))
         return recipe
 
+    def replace_image(self, recipe, image):
+        '''
+        Старое изображение и его варианты удаляются после коммита,
+        варианты нового создаются в фоне. Если загружены те же байты,
+        имя файла не меняется и ничего не делается: возвращает False
+        '''
+        field = recipe._meta.get_field('image')
+        if field.storage.content_name(
+            field.generate_filename(recipe, image.name), image
+        ) == recipe.image.name:
+            return False
+        names = (
+            recipe.image.name, recipe.thumbnail.name, recipe.image_webp.name
+        )
+        recipe.thumbnail = recipe.image_webp = ''
+        recipe.image_failed = False
+        transaction.on_commit(lambda: images.delete_files(*names))
+        transaction.on_commit(lambda: images.schedule(recipe.pk))
+        return True
+
+    def update_search_document(self, recipe, validated_data, ingredient_ids):
+        '''Документ пересобирается, только если поменялся его текст'''
+        if ingredient_ids is None:
+            if not {'name', 'text'} & validated_data.keys():
+                return False
+            ingredient_ids = recipe.recipeingredients_set.values_list(
+                'ingredient', flat=True
+            )
+        validated_data['search_document'] = search.document(
+            validated_data.get('name', recipe.name),
+            validated_data.get('text', recipe.text),
+            search.ingredient_names(ingredient_ids)
+        )
+        return True
+
+    @transaction.atomic
     def update(self, instance, validated_data):
+        ingredient_ids = None
         if validated_data.get('tags'):
-            tags = validated_data.pop('tags')
-            instance.recipe_tags.all().delete()
-            self.create_tags(tags, instance)
-        if validated_data.get('image'):
-            instance.image.delete()
+            self.update_tags(validated_data.pop('tags'), instance)
+        image = validated_data.get('image')
+        if image and not self.replace_image(instance, image):
+            del validated_data['image']
         if validated_data.get('recipeingredients_set'):
-            ingredients = validated_data.pop('recipeingredients_set')
-            instance.recipeingredients_set.all().delete()
-            self.create_ingredients(ingredients, instance)
-        return super().update(instance, validated_data)
+            old_amounts, new_amounts = self.update_ingredients(
+                validated_data.pop('recipeingredients_set'), instance
+            )
+            ShopListTotals.objects.change_recipe(
+                instance, old_amounts, new_amounts
+            )
+            ingredient_ids = new_amounts
+            validated_data['ingredients_count'] = len(new_amounts)
+        reindex = self.update_search_document(
+            instance, validated_data, ingredient_ids
+        )
+        instance = super().update(instance, validated_data)
+        if reindex:
+            search.index([instance])
+        return instance
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -180,6 +320,35 @@ class RecipesSerializer(serializers.ModelSerializer):
         return data
 
 
+class RecipesListSerializer(RecipesSerializer):
+    '''
+    Рецепты в списке: рядом с оригиналом изображения миниатюра.
+    favorites_count отдаётся только в рецепте: ETag списка не
+    меняется с каждым добавлением в избранное.
+    '''
+
+    thumbnail = ThumbnailField()
+
+    class Meta(RecipesSerializer.Meta):
+        fields = tuple(
+            field for field in RecipesSerializer.Meta.fields
+            if field != 'favorites_count'
+        ) + ('thumbnail',)
+
+
+class RecipesCoverageSerializer(RecipesListSerializer):
+    '''Рецепт в подборке по ингредиентам: сколько их есть и не хватает'''
+
+    matched = serializers.IntegerField(read_only=True)
+    missing = serializers.IntegerField(read_only=True)
+    coverage = serializers.FloatField(read_only=True)
+
+    class Meta(RecipesListSerializer.Meta):
+        fields = RecipesListSerializer.Meta.fields + (
+            'matched', 'missing', 'coverage'
+        )
+
+
 class IngredientsSerializer(serializers.ModelSerializer):
 
     class Meta:
@@ -0,0 +1,143 @@
+import csv
+import json
+import os
+import tempfile
+from functools import lru_cache
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+from rest_framework import renderers
+
+FONT_NAME = 'FreeSans'
+FONT_PATH = os.path.join(settings.BASE_DIR, 'FreeSans.ttf')
+TITLE = 'Список покупок'
+PAGE_TOP = 750
+PAGE_BOTTOM = 50
+LINE_HEIGHT = 20
+SPOOL_SIZE = 1024 * 1024
+
+
+class ShoplistRenderer(renderers.BaseRenderer):
+    '''
+    Рендер нужен только для выбора формата через ?format=,
+    сам файл отдаёт вьюха. Через рендер проходят лишь ошибки.
+    '''
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class PDFRenderer(ShoplistRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+
+
+class CSVRenderer(ShoplistRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class TextRenderer(ShoplistRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+
+def get_shoplist(user):
+    '''Суммы ингредиентов корзины, поддерживаемые ShopListTotals'''
+    return user.shoplist_totals.values(
+        'ingredient__id', 'ingredient__name', 'ingredient__measuring_unit',
+        'amount'
+    ).order_by('ingredient__name')
+
+
+def get_lines(results):
+    for number, obj in enumerate(results.iterator(), start=1):
+        yield (
+            f"{number}. {obj['ingredient__name']}: {obj['amount']} "
+            f"{obj['ingredient__measuring_unit']}"
+        )
+
+
+@lru_cache(maxsize=None)
+def register_font():
+    pdfmetrics.registerFont(TTFont(FONT_NAME, FONT_PATH))
+    return FONT_NAME
+
+
+def draw_header(file):
+    file.setFont(register_font(), 30)
+    file.drawString(200, PAGE_TOP, TITLE)
+    file.setFont(register_font(), 18)
+    file.drawString(
+        0, PAGE_TOP - 20, '---------------------------------------------------'
+        '-----------------------------------------------------------'
+    )
+    return PAGE_TOP - 50
+
+
+def get_pdf(results):
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    file = Canvas(buffer, pagesize=A4)
+    y = draw_header(file)
+    for line in get_lines(results):
+        if y < PAGE_BOTTOM:
+            file.showPage()
+            file.setFont(register_font(), 18)
+            y = PAGE_TOP
+        file.drawString(50, y, line)
+        y -= LINE_HEIGHT
+    file.showPage()
+    file.save()
+    buffer.seek(0)
+    return FileResponse(
+        buffer, as_attachment=True, filename='shoplist.pdf',
+        content_type=PDFRenderer.media_type
+    )
+
+
+class Echo:
+    '''Псевдофайл для csv.writer, возвращающий записанную строку'''
+
+    def write(self, value):
+        return value
+
+
+def get_csv(results):
+    writer = csv.writer(Echo())
+    rows = (
+        writer.writerow((
+            obj['ingredient__name'], obj['amount'],
+            obj['ingredient__measuring_unit']
+        )) for obj in results.iterator()
+    )
+    return streaming_response(rows, CSVRenderer, 'shoplist.csv')
+
+
+def get_txt(results):
+    lines = (f'{line}\n' for line in get_lines(results))
+    return streaming_response(lines, TextRenderer, 'shoplist.txt')
+
+
+def streaming_response(content, renderer, filename):
+    response = StreamingHttpResponse(
+        content, content_type=f'{renderer.media_type}; charset=utf-8'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+WRITERS = {
+    PDFRenderer.format: get_pdf,
+    CSVRenderer.format: get_csv,
+    TextRenderer.format: get_txt,
+}
+
+
+def get_shoplist_response(user, format):
+    return WRITERS[format](get_shoplist(user))
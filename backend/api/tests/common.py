@@ -1,3 +1,7 @@
+from contextlib import contextmanager
+
+from django.db import connection
+
 TAG_1_DATA = {"name": "Завтрак", "color": "#E26C2D", "slug": "breakfast"}
 TAG_2_DATA = {"name": "Обед", "color": "#39FF14", "slug": "dinner"}
 SUPERUSER_DATA = {
@@ -8,3 +12,26 @@ USER_DATA = {
     'username': 'Leo', 'email': 'Leo@god.com', 'password': '12345',
     'first_name': 'Leo', 'last_name': 'Tolstoi'
 }
+INGREDIENT_DATA = {'name': 'Капуста', 'measuring_unit': 'г'}
+RECIPE_DATA = {
+    'name': 'Щи', 'text': 'Сварить капусту', 'cooking_time': 30,
+    'image': 'recipes/shchi.png',
+}
+IMAGE_DATA = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAAD'
+    'UlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=='
+)
+
+
+@contextmanager
+def on_commit_callbacks():
+    '''
+    Выполняет колбэки transaction.on_commit, добавленные в блоке:
+    TestCase не коммитит транзакцию. В Django 3.2 это
+    TestCase.captureOnCommitCallbacks(execute=True)
+    '''
+    start = len(connection.run_on_commit)
+    yield
+    while len(connection.run_on_commit) > start:
+        _, callback = connection.run_on_commit.pop(start)
+        callback()
@@ -0,0 +1,133 @@
+import asyncio
+import io
+import json
+import threading
+
+from django.core.wsgi import get_wsgi_application
+from django.http import FileResponse
+from django.test import SimpleTestCase
+
+from backend.asgi import ThreadPoolASGI
+
+
+class Stream(list):
+    streaming = True
+
+    def close(self):
+        pass
+
+
+class TestThreadPoolASGI(SimpleTestCase):
+
+    def setUp(self):
+        self.application = ThreadPoolASGI(get_wsgi_application(), 2)
+
+    def tearDown(self):
+        self.application.executor.shutdown()
+
+    def call(self, scope, messages, on_send=None):
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            if on_send is not None:
+                await on_send(message)
+            sent.append(message)
+
+        asyncio.run(self.application(scope, receive, send))
+        return sent
+
+    def request(self, method, path, query=b'', body=b'', on_send=None):
+        scope = {
+            'type': 'http', 'method': method, 'path': path,
+            'query_string': query, 'http_version': '1.1',
+            'headers': [
+                (b'host', b'testserver'), (b'accept', b'application/json'),
+                (b'content-type', b'application/json'),
+            ],
+        }
+        half = len(body) // 2
+        return self.call(scope, [
+            {'type': 'http.request', 'body': body[:half], 'more_body': True},
+            {'type': 'http.request', 'body': body[half:]},
+        ], on_send)
+
+    def test_response(self):
+        start, body = self.request('GET', '/api/', b'format=json')
+        self.assertEqual(start['status'], 200)
+        self.assertIn(
+            (b'content-type', b'application/json'), start['headers']
+        )
+        self.assertIn('recipes', json.loads(body['body']))
+
+    def test_body(self):
+        '''Тело из нескольких сообщений собирается до вызова приложения'''
+        def echo(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return Stream([
+                environ['CONTENT_TYPE'].encode(), b' ',
+                environ['wsgi.input'].read()
+            ])
+
+        self.application.executor.shutdown()
+        self.application = ThreadPoolASGI(echo, 1)
+        start, *chunks, end = self.request('POST', '/', body=b'0123456789')
+        self.assertEqual(
+            b''.join(chunk['body'] for chunk in chunks),
+            b'application/json 0123456789'
+        )
+        self.assertTrue(all(chunk['more_body'] for chunk in chunks))
+        self.assertEqual(end, {'type': 'http.response.body', 'body': b''})
+
+    def test_stream_in_one_thread(self):
+        '''Потоковый ответ читается и закрывается в одном потоке'''
+        threads = []
+
+        class Chunks(Stream):
+            def __iter__(self):
+                for chunk in super().__iter__():
+                    threads.append(threading.get_ident())
+                    yield chunk
+
+            def close(self):
+                threads.append(threading.get_ident())
+
+        def stream(environ, start_response):
+            start_response('200 OK', [('Content-Type', 'text/plain')])
+            return Chunks([b'a', b'b', b'c', b'd'])
+
+        self.application.executor.shutdown()
+        self.application = ThreadPoolASGI(stream, 4)
+        start, *chunks, end = self.request('GET', '/')
+        self.assertEqual(start['status'], 200)
+        self.assertEqual(b''.join(chunk['body'] for chunk in chunks), b'abcd')
+        self.assertEqual(len(threads), 5)
+        self.assertEqual(len(set(threads)), 1)
+
+    def test_file_frees_thread(self):
+        '''Файл читается в потоке, и тот свободен до отправки тела'''
+        def download(environ, start_response):
+            response = FileResponse(io.BytesIO(b'%PDF' * 10000))
+            start_response('200 OK', list(response.items()))
+            return response
+
+        async def on_send(message):
+            if message['type'] == 'http.response.body':
+                await asyncio.wait_for(self.application.run(int), 1)
+
+        self.application.executor.shutdown()
+        self.application = ThreadPoolASGI(download, 1)
+        start, body = self.request('GET', '/', on_send=on_send)
+        self.assertEqual(start['status'], 200)
+        self.assertEqual(body['body'], b'%PDF' * 10000)
+
+    def test_lifespan(self):
+        sent = self.call({'type': 'lifespan'}, [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}
+        ])
+        self.assertEqual(
+            [message['type'] for message in sent],
+            ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        )
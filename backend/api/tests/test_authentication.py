@@ -0,0 +1,84 @@
+from django.core.cache import caches
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient, APITestCase
+
+from api import authentication
+from api.tests.common import USER_DATA
+from users.models import User
+
+
+class TestCachedTokenAuthentication(APITestCase):
+    url_me = '/api/users/me/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**USER_DATA)
+
+    def setUp(self):
+        authentication.tokens.clear()
+        self.client = APIClient()
+        response = self.client.post('/api/auth/token/login/', {
+            'email': USER_DATA['email'], 'password': USER_DATA['password']
+        })
+        self.token = response.data['auth_token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def token_queries(self, method='get', url=url_me, data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url, data)
+        return response, [
+            query for query in context.captured_queries
+            if Token._meta.db_table in query['sql']
+        ]
+
+    def test_cached(self):
+        self.assertEqual(len(self.token_queries()[1]), 1)
+        response, queries = self.token_queries()
+        self.assertEqual(response.data['username'], USER_DATA['username'])
+        self.assertEqual(queries, [])
+
+    def test_unsafe_methods_read_database(self):
+        self.token_queries()
+        response, queries = self.token_queries(
+            'patch', self.url_me, {'first_name': 'Лев'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+
+    def test_logout(self):
+        self.token_queries()
+        self.assertEqual(
+            self.client.post('/api/auth/token/logout/').status_code, 204
+        )
+        self.assertEqual(self.client.get(self.url_me).status_code, 401)
+
+    def test_password_change(self):
+        self.token_queries()
+        self.client.post('/api/users/set_password/', {
+            'current_password': USER_DATA['password'],
+            'new_password': 'Novaya-parol-42'
+        })
+        self.assertEqual(len(self.token_queries()[1]), 1)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.user.refresh_from_db()
+        self.user.save()
+        self.assertEqual(self.client.get(self.url_me).status_code, 401)
+
+    @override_settings(AUTH_TOKEN_CACHE='default')
+    def test_shared_cache(self):
+        '''В общем кэше только id и is_active, без хэша пароля'''
+        self.token_queries()
+        self.assertEqual(
+            caches['default'].get(authentication.shared_key(self.token)),
+            (self.user.pk, True)
+        )
+        authentication.tokens.clear()
+        response, queries = self.token_queries()
+        self.assertEqual(queries, [])
+        self.assertEqual(response.data['username'], USER_DATA['username'])
+        Token.objects.filter(key=self.token).delete()
+        authentication.tokens.clear()
+        self.assertEqual(self.client.get(self.url_me).status_code, 401)
@@ -0,0 +1,149 @@
+from datetime import timedelta
+
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+
+from api.tests.common import (INGREDIENT_DATA, RECIPE_DATA, TAG_1_DATA,
+                              TAG_2_DATA, USER_DATA, on_commit_callbacks)
+from foodgram.models import (Ingredients, RecipeIngredients, Recipes,
+                             RecipeTags, Tags)
+from users.models import User
+
+
+class TestConditionalRequests(APITestCase):
+    url_recipes = '/api/recipes/'
+    url_recipe = '/api/recipes/{}/'
+    url_favorite = '/api/recipes/{}/favorite/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**USER_DATA)
+        cls.recipe = Recipes.objects.create(author=cls.user, **RECIPE_DATA)
+        cls.tag = Tags.objects.create(**TAG_1_DATA)
+        cls.ingredient = Ingredients.objects.create(**INGREDIENT_DATA)
+        RecipeTags.objects.create(recipe=cls.recipe, tag=cls.tag)
+        RecipeIngredients.objects.create(
+            recipe=cls.recipe, ingredient=cls.ingredient, amount=1
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        caches['reference'].clear()
+        caches['default'].clear()
+        Recipes.objects.update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+
+    def revalidate(self, url, queries, **headers):
+        '''Повторный запрос с валидаторами первого ответа'''
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+        with self.assertNumQueries(queries):
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag'], **headers
+            )
+        return response
+
+    def test_not_modified(self):
+        '''304 отдаётся без сериализации и почти без запросов'''
+        cases = (
+            (self.url_recipes, 0), (self.url_recipe.format(self.recipe.id), 1),
+            ('/api/tags/', 0), ('/api/tags/1/', 0),
+            ('/api/ingredients/', 0),
+        )
+        for url, queries in cases:
+            with self.subTest(url=url):
+                response = self.revalidate(url, queries)
+                self.assertEqual(response.status_code, 304)
+                self.assertIn('ETag', response)
+
+    def test_last_modified(self):
+        '''Аноним получает Last-Modified и 304 по If-Modified-Since'''
+        url = self.url_recipe.format(self.recipe.id)
+        last_modified = self.client.get(url)['Last-Modified']
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                url, HTTP_IF_MODIFIED_SINCE=last_modified
+            )
+        self.assertEqual(response.status_code, 304)
+        self.client.force_authenticate(self.user)
+        self.assertNotIn('Last-Modified', self.client.get(url))
+
+    def test_changes_move_last_modified(self):
+        '''Правки автора, тэгов, ингредиентов и избранного сдвигают дату'''
+        url = self.url_recipe.format(self.recipe.id)
+        changes = {
+            'author': lambda: User.objects.filter(pk=self.user.pk).first(
+            ).save(),
+            'tag': lambda: Tags.objects.filter(pk=self.tag.pk).first().save(),
+            'ingredient': lambda: Ingredients.objects.filter(
+                pk=self.ingredient.pk
+            ).first().save(),
+            'favorite': lambda: self.client.post(
+                self.url_favorite.format(self.recipe.id)
+            ),
+            'tag deletion': lambda: Tags.objects.all().delete(),
+        }
+        for name, change in changes.items():
+            with self.subTest(change=name):
+                self.client.force_authenticate(None)
+                last_modified = self.client.get(url)['Last-Modified']
+                self.client.force_authenticate(self.user)
+                with on_commit_callbacks():
+                    change()
+                self.client.force_authenticate(None)
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('Last-Modified', response)
+                Recipes.objects.update(
+                    updated_at=timezone.now() - timedelta(hours=1)
+                )
+
+    def test_favorite_invalidates_recipe_etag(self):
+        '''Избранное меняет ETag рецепта, но не ETag списка'''
+        url = self.url_recipe.format(self.recipe.id)
+        recipe = self.client.get(url)
+        recipes = self.client.get(self.url_recipes)
+        self.assertNotIn('favorites_count', recipes.data['results'][0])
+        self.client.force_authenticate(self.user)
+        with on_commit_callbacks():
+            self.client.post(self.url_favorite.format(self.recipe.id))
+        self.client.force_authenticate(None)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=recipe['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['favorites_count'], 1)
+        self.assertEqual(self.client.get(
+            self.url_recipes, HTTP_IF_NONE_MATCH=recipes['ETag']
+        ).status_code, 304)
+
+    def test_author_change_invalidates_etag(self):
+        url = self.url_recipe.format(self.recipe.id)
+        response = self.client.get(url)
+        self.user.first_name = 'Лев'
+        with on_commit_callbacks():
+            self.user.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['author']['first_name'], 'Лев')
+
+    def test_changes_invalidate_etag(self):
+        '''Правки рецептов, справочников и связей меняют ETag'''
+        self.client.force_authenticate(self.user)
+        changes = (
+            lambda: self.recipe.save(),
+            lambda: Tags.objects.create(**TAG_2_DATA),
+            lambda: self.client.post(self.url_favorite.format(self.recipe.id)),
+        )
+        for change in changes:
+            etag = self.client.get(self.url_recipes)['ETag']
+            with on_commit_callbacks():
+                change()
+            response = self.client.get(
+                self.url_recipes, HTTP_IF_NONE_MATCH=etag
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response['ETag'], etag)
@@ -0,0 +1,44 @@
+import time
+from unittest import mock
+
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from django.test import override_settings
+from rest_framework.test import APIClient, APITestCase
+
+from backend import db
+
+
+class TestConnectionHealthCheck(APITestCase):
+    url_tags = '/api/tags/'
+
+    def setUp(self):
+        '''Обработчики подключаются так же, как в backend.wsgi'''
+        db.connect()
+        self.addCleanup(
+            request_started.disconnect,
+            dispatch_uid='backend.db.check_connections'
+        )
+        self.addCleanup(
+            request_finished.disconnect,
+            dispatch_uid='backend.db.remember_connections'
+        )
+        self.client = APIClient()
+        self.client.get(self.url_tags)
+
+    def request(self, usable):
+        with mock.patch.object(
+            connection, 'is_usable', return_value=usable
+        ) as is_usable, mock.patch.object(connection, 'close') as close:
+            self.client.get(self.url_tags)
+        return is_usable.called, close.called
+
+    def test_fresh_connection_is_not_checked(self):
+        self.assertEqual(self.request(usable=False), (False, False))
+
+    @override_settings(DB_HEALTH_CHECK_IDLE=1)
+    def test_idle_connection(self):
+        connection.last_used = time.monotonic() - 2
+        self.assertEqual(self.request(usable=True), (True, False))
+        connection.last_used = time.monotonic() - 2
+        self.assertEqual(self.request(usable=False), (True, True))
@@ -0,0 +1,80 @@
+from rest_framework.test import APIClient, APITestCase
+
+from api.tests.common import RECIPE_DATA, TAG_1_DATA, USER_DATA
+from api.tests.test_indexes import ExplainMixin
+from foodgram import counters
+from foodgram.models import (Ingredients, RecipeIngredients, Recipes,
+                             RecipeTags, Tags)
+from users.models import User
+
+
+class TestCook(ExplainMixin, APITestCase):
+    url_cook = '/api/recipes/cook/'
+    tables = (RecipeIngredients._meta.db_table,)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**USER_DATA)
+        cls.tag = Tags.objects.create(**TAG_1_DATA)
+        cls.cabbage, cls.carrot, cls.beet, cls.potato = [
+            Ingredients.objects.create(name=name, measuring_unit='г')
+            for name in ('Капуста', 'Морковь', 'Свёкла', 'Картофель')
+        ]
+        cls.salad, cls.borsch, cls.beets, cls.mash = [
+            cls.create(ingredients) for ingredients in (
+                (cls.cabbage, cls.carrot),
+                (cls.cabbage, cls.carrot, cls.beet, cls.potato),
+                (cls.beet,),
+                (cls.potato,),
+            )
+        ]
+        RecipeTags.objects.create(recipe_id=cls.beets, tag=cls.tag)
+        counters.recount()
+
+    @classmethod
+    def create(cls, ingredients):
+        recipe = Recipes.objects.create(author=cls.user, **RECIPE_DATA)
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(recipe=recipe, ingredient=ingredient, amount=1)
+            for ingredient in ingredients
+        )
+        return recipe.pk
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def cook(self, *ingredients, **params):
+        return self.client.get(self.url_cook, {
+            'ingredients': [ingredient.pk for ingredient in ingredients],
+            **params
+        })
+
+    def test_ranking(self):
+        '''Сначала рецепты, для которых всё есть, затем с нехваткой'''
+        response = self.cook(self.cabbage, self.carrot, self.beet, self.beet)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [
+                (recipe['id'], recipe['matched'], recipe['missing'])
+                for recipe in response.data['results']
+            ],
+            [(self.beets, 1, 0), (self.salad, 2, 0), (self.borsch, 3, 1)]
+        )
+        self.assertEqual(response.data['results'][2]['coverage'], 0.75)
+
+    def test_filters(self):
+        response = self.cook(self.beet, tags='breakfast')
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.beets]
+        )
+
+    def test_validation(self):
+        self.assertEqual(self.cook().status_code, 400)
+        response = self.client.get(self.url_cook, {'ingredients': 'соль'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ingredients', response.data)
+
+    def test_index(self):
+        '''Читаются только списки рецептов для переданных ингредиентов'''
+        self.assertNoRelationScans(lambda: self.cook(self.beet, self.potato))
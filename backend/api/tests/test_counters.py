@@ -0,0 +1,77 @@
+import io
+
+from django.core.management import CommandError, call_command
+from rest_framework.test import APIClient, APITestCase
+
+from api.tests.common import RECIPE_DATA, USER_DATA
+from foodgram import counters
+from foodgram.models import Favorites, Recipes, Subscriptions
+from users.models import User
+
+
+class TestCounters(APITestCase):
+    url_recipes = '/api/recipes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**USER_DATA)
+        cls.author = User.objects.create_user(
+            username='Author', email='author@god.com', password='12345'
+        )
+        cls.recipes = [
+            Recipes.objects.create(author=cls.author, **RECIPE_DATA).pk
+            for _ in range(4)
+        ]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_consistency(self):
+        '''Счётчики совпадают с таблицами после любых изменений через API'''
+        first, second, *rest = self.recipes
+        self.client.post(f'{self.url_recipes}{first}/favorite/')
+        self.client.post(f'{self.url_recipes}{first}/favorite/')
+        self.client.post(f'{self.url_recipes}{second}/favorite/')
+        self.client.delete(f'{self.url_recipes}{second}/favorite/')
+        self.client.post(
+            f'{self.url_recipes}favorite/', {'ids': self.recipes}
+        )
+        self.client.delete(f'{self.url_recipes}favorite/', {'ids': rest})
+        self.client.post(f'/api/users/{self.author.pk}/subscribe/')
+        self.client.force_authenticate(self.author)
+        self.client.post(f'{self.url_recipes}{first}/favorite/')
+        self.client.delete(f'{self.url_recipes}{rest[0]}/')
+        self.assertEqual(counters.verify(), [])
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 3)
+        self.assertEqual(self.author.subscribers_count, 1)
+        response = self.client.get(f'{self.url_recipes}{first}/')
+        self.assertEqual(response.data['favorites_count'], 2)
+
+    def test_model_changes(self):
+        '''Связи, созданные и удалённые в обход API, тоже учитываются'''
+        first, second, *_ = self.recipes
+        reader = User.objects.create_user(
+            username='Reader', email='reader@god.com', password='12345'
+        )
+        for user in (self.user, reader):
+            Favorites.objects.create(user=user, recipe_id=first)
+            Subscriptions.objects.create(subscriber=user, author=self.author)
+        Favorites.objects.create(user=reader, recipe_id=second)
+        self.assertEqual(counters.verify(), [])
+        reader.delete()
+        self.assertEqual(counters.verify(), [])
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.subscribers_count, 1)
+        self.assertEqual(Recipes.objects.get(pk=first).favorites_count, 1)
+
+    def test_repair(self):
+        Recipes.objects.filter(pk=self.recipes[0]).update(favorites_count=5)
+        User.objects.filter(pk=self.author.pk).update(recipes_count=0)
+        with self.assertRaises(CommandError):
+            call_command('repair_counters', '--check', stdout=io.StringIO())
+        call_command('repair_counters', stdout=io.StringIO())
+        self.assertEqual(counters.verify(), [])
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.recipes_count, 4)
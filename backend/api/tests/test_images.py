@@ -0,0 +1,249 @@
+import base64
+import hashlib
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import override_settings
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient, APITestCase
+
+from api.fields import StreamingBase64ImageField
+from api.tests.common import (IMAGE_DATA, RECIPE_DATA, USER_DATA,
+                              on_commit_callbacks)
+from foodgram import images
+from foodgram.models import FileLocks, Recipes, Subscriptions
+from foodgram.storage import content_storage
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def png(size):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, THUMBNAIL_SIZE=(100, 100))
+class TestRecipeImages(APITestCase):
+    url_recipes = '/api/recipes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**USER_DATA)
+        cls.author = User.objects.create_user(
+            username='Author', email='author@god.com', password='12345'
+        )
+        Subscriptions.objects.create(subscriber=cls.user, author=cls.author)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+        self.recipe = Recipes(author=self.author, **RECIPE_DATA)
+        self.recipe.image.save('shchi.png', png((400, 200)))
+
+    def test_process(self):
+        self.assertTrue(images.process(self.recipe.pk))
+        self.recipe.refresh_from_db()
+        with Image.open(self.recipe.thumbnail.path) as thumbnail:
+            self.assertEqual(thumbnail.format, 'WEBP')
+            self.assertEqual(thumbnail.size, (100, 50))
+        with Image.open(self.recipe.image_webp.path) as full:
+            self.assertEqual(full.size, (400, 200))
+
+    def test_lists_add_thumbnails(self):
+        '''
+        Списки рецептов и подписок отдают в image оригинал, а в thumbnail
+        миниатюру, когда она есть
+        '''
+        self.client.force_authenticate(self.user)
+        recipe = self.client.get(self.url_recipes).data['results'][0]
+        self.assertTrue(recipe['image'].endswith(self.recipe.image.name))
+        self.assertTrue(recipe['thumbnail'].endswith(self.recipe.image.name))
+        images.process(self.recipe.pk)
+        self.recipe.refresh_from_db()
+        recipe = self.client.get(self.url_recipes).data['results'][0]
+        self.assertTrue(recipe['image'].endswith(self.recipe.image.name))
+        self.assertTrue(
+            recipe['thumbnail'].endswith(self.recipe.thumbnail.name)
+        )
+        feed = self.client.get('/api/users/subscriptions/').data['results']
+        recipe = feed[0]['recipes'][0]
+        self.assertTrue(recipe['image'].endswith(self.recipe.image.name))
+        self.assertTrue(
+            recipe['thumbnail'].endswith(self.recipe.thumbnail.name)
+        )
+        recipe = self.client.get(f'{self.url_recipes}{self.recipe.pk}/')
+        self.assertTrue(recipe.data['image'].endswith(self.recipe.image.name))
+
+    def test_new_image_resets_variants(self):
+        images.process(self.recipe.pk)
+        response = self.client.patch(
+            f'{self.url_recipes}{self.recipe.pk}/', {'image': IMAGE_DATA}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.thumbnail)
+        self.assertFalse(self.recipe.image_webp)
+
+    def test_same_image_keeps_variants(self):
+        '''Повторная загрузка тех же байтов не сбрасывает варианты'''
+        images.process(self.recipe.pk)
+        self.recipe.refresh_from_db()
+        with self.recipe.image.open('rb') as file:
+            data = base64.b64encode(file.read()).decode()
+        response = self.client.patch(
+            f'{self.url_recipes}{self.recipe.pk}/',
+            {'image': f'data:image/png;base64,{data}'}
+        )
+        self.assertEqual(response.status_code, 200)
+        thumbnail = self.recipe.thumbnail.name
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.thumbnail.name, thumbnail)
+
+    def test_command(self):
+        '''Битые изображения пропускаются, остальные обрабатываются'''
+        broken = Recipes.objects.create(
+            author=self.author, **{**RECIPE_DATA, 'image': 'recipes/no.png'}
+        )
+        call_command(
+            'process_images', stdout=io.StringIO(), stderr=io.StringIO()
+        )
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.thumbnail)
+        self.assertEqual(
+            list(Recipes.objects.filter(thumbnail='').values_list(
+                'pk', 'image_failed'
+            )), [(broken.pk, True)]
+        )
+        stderr = io.StringIO()
+        call_command('process_images', stdout=io.StringIO(), stderr=stderr)
+        self.assertEqual(stderr.getvalue(), '')
+
+    def test_command_survives_any_error(self):
+        '''Любая ошибка рецепта пишется в stderr и не прерывает обход'''
+        other = Recipes(author=self.author, **RECIPE_DATA)
+        other.image.save('other.png', png((50, 50)))
+        stderr = io.StringIO()
+        with mock.patch.object(
+            images, 'render_variants', side_effect=[
+                Image.DecompressionBombError('bomb'),
+                images.render_variants(png((50, 50))),
+            ]
+        ):
+            call_command(
+                'process_images', stdout=io.StringIO(), stderr=stderr
+            )
+        self.assertIn('DecompressionBombError', stderr.getvalue())
+        self.assertEqual(
+            Recipes.objects.filter(image_failed=True).count(), 1
+        )
+        self.assertEqual(Recipes.objects.exclude(thumbnail='').count(), 1)
+
+    def test_new_image_clears_failure(self):
+        Recipes.objects.filter(pk=self.recipe.pk).update(image_failed=True)
+        response = self.client.patch(
+            f'{self.url_recipes}{self.recipe.pk}/', {'image': IMAGE_DATA}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image_failed)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TestContentAddressedStorage(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(**USER_DATA)
+
+    def create_recipe(self, content):
+        recipe = Recipes(author=self.author, **RECIPE_DATA)
+        recipe.image.save('shchi.png', content)
+        return recipe
+
+    def test_deduplication(self):
+        '''Одинаковые файлы хранятся один раз под именем-хэшем'''
+        content = png((30, 20))
+        digest = hashlib.sha256(content.read()).hexdigest()
+        first = self.create_recipe(content)
+        second = self.create_recipe(png((30, 20)))
+        self.assertEqual(
+            first.image.name, f'recipes/{digest[:2]}/{digest}.png'
+        )
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertNotEqual(
+            self.create_recipe(png((20, 30))).image.name, first.image.name
+        )
+
+    def test_reference_counting(self):
+        '''Файл удаляется, только когда на него не ссылается ни один рецепт'''
+        first = self.create_recipe(png((30, 20)))
+        second = self.create_recipe(png((30, 20)))
+        name = first.image.name
+        self.assertTrue(FileLocks.objects.filter(name=name).exists())
+        first.delete()
+        content_storage.delete(name)
+        self.assertTrue(content_storage.exists(name))
+        second.delete()
+        content_storage.delete(name)
+        self.assertFalse(content_storage.exists(name))
+        self.assertFalse(FileLocks.objects.filter(name=name).exists())
+
+    def test_cascade_deletes_files(self):
+        '''Файлы рецептов, удалённых вместе с автором, тоже удаляются'''
+        name = self.create_recipe(png((30, 20))).image.name
+        with on_commit_callbacks():
+            User.objects.filter(pk=self.author.pk).delete()
+        self.assertFalse(content_storage.exists(name))
+        self.assertFalse(FileLocks.objects.exists())
+
+
+class TestStreamingBase64ImageField(APITestCase):
+
+    def setUp(self):
+        self.field = StreamingBase64ImageField()
+
+    def error(self, data):
+        with self.assertRaises(ValidationError) as context:
+            self.field.to_internal_value(data)
+        return context.exception.detail[0].code
+
+    def test_decode(self):
+        file = self.field.to_internal_value(IMAGE_DATA)
+        self.assertTrue(file.name.endswith('.png'))
+        self.assertEqual(file.content_type, 'image/png')
+        self.assertEqual(
+            file.read(), base64.b64decode(IMAGE_DATA.split(',')[1])
+        )
+
+    @override_settings(IMAGE_MAX_BYTES=1000)
+    def test_too_large(self):
+        '''Размер отсекается по длине строки, до декодирования'''
+        self.assertEqual(
+            self.error('data:image/png;base64,' + '!' * 2000), 'too_large'
+        )
+
+    @override_settings(IMAGE_MAX_SIDE=100)
+    def test_too_big(self):
+        payload = base64.b64encode(png((200, 10)).read()).decode()
+        self.assertEqual(self.error(payload), 'too_big')
+
+    def test_invalid(self):
+        self.assertEqual(
+            self.error('data:image/png;base64,!!!!'), 'invalid_base64'
+        )
+        self.assertEqual(
+            self.error(base64.b64encode(b'text').decode()), 'invalid_image'
+        )
+        self.assertEqual(self.error(42), 'invalid_base64')
@@ -0,0 +1,134 @@
+import re
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase
+
+from api.tests.common import (INGREDIENT_DATA, RECIPE_DATA, TAG_1_DATA,
+                              USER_DATA)
+from foodgram.models import (Favorites, Ingredients, RecipeIngredients,
+                             Recipes, RecipeTags, ShopLists, Subscriptions,
+                             Tags)
+from users.models import User
+
+RELATION_TABLES = (
+    Favorites._meta.db_table, ShopLists._meta.db_table,
+    Subscriptions._meta.db_table,
+)
+ALIAS = re.compile(r'"(\w+)"(?: AS)? (U\d+|T\d+)\b')
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+POSTGRESQL_SCAN = re.compile(r'Seq Scan on (\w+)')
+EXPLAINED = ('SELECT', 'UPDATE', 'DELETE')
+
+
+class ExplainMixin:
+    '''
+    Прогоняет через EXPLAIN все запросы к таблицам tables (по умолчанию
+    к таблицам связей), выполненные внутри блока, и ищет среди планов
+    полный проход по этим таблицам. В PostgreSQL последовательное чтение
+    запрещается, чтобы на маленьких таблицах планировщик
+    выбирал индекс, если тот вообще подходит.
+    '''
+
+    tables = RELATION_TABLES
+
+    def capture(self, function):
+        with CaptureQueriesContext(connection) as context:
+            function()
+        return [
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith(EXPLAINED)
+            and any(table in query['sql'] for table in self.tables)
+        ]
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute('SET enable_seqscan = off')
+                cursor.execute(f'EXPLAIN {sql}')
+                plan = [row[0] for row in cursor.fetchall()]
+                cursor.execute('RESET enable_seqscan')
+                return [
+                    match.group(1) for match in map(
+                        POSTGRESQL_SCAN.search, plan
+                    ) if match
+                ]
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            aliases = {alias: table for table, alias in ALIAS.findall(sql)}
+            return [
+                aliases.get(match.group(1), match.group(1))
+                for match in (
+                    SQLITE_SCAN.match(row[-1]) for row in cursor.fetchall()
+                ) if match
+            ]
+
+    def assertNoRelationScans(self, function):
+        queries = self.capture(function)
+        self.assertTrue(queries)
+        for sql in queries:
+            scanned = set(self.explain(sql)).intersection(self.tables)
+            self.assertFalse(scanned, f'{scanned}: {sql}')
+
+
+class TestRelationIndexes(ExplainMixin, APITestCase):
+    url_recipes = '/api/recipes/'
+    url_subscriptions = '/api/users/subscriptions/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**USER_DATA)
+        cls.author = User.objects.create_user(
+            username='Author', email='author@god.com', password='12345'
+        )
+        tag = Tags.objects.create(**TAG_1_DATA)
+        ingredient = Ingredients.objects.create(**INGREDIENT_DATA)
+        for index in range(4):
+            recipe = Recipes.objects.create(author=cls.author, **RECIPE_DATA)
+            RecipeTags.objects.create(recipe=recipe, tag=tag)
+            RecipeIngredients.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=index + 1
+            )
+            if index % 2:
+                Favorites.objects.create(user=cls.user, recipe=recipe)
+            else:
+                ShopLists.objects.create(user=cls.user, recipe=recipe)
+        Subscriptions.objects.create(subscriber=cls.user, author=cls.author)
+        cls.recipe = recipe
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_recipes_list(self):
+        self.assertNoRelationScans(lambda: self.client.get(self.url_recipes))
+
+    def test_recipes_filters(self):
+        '''Фильтры избранного и корзины идут по индексу (user, recipe)'''
+        self.assertNoRelationScans(lambda: self.client.get(
+            self.url_recipes, {'is_favorited': 1, 'is_in_shopping_cart': 1}
+        ))
+
+    def test_subscriptions(self):
+        self.assertNoRelationScans(
+            lambda: self.client.get(self.url_subscriptions)
+        )
+
+    def test_relations_toggle(self):
+        '''Добавление и удаление связей не читают таблицы целиком'''
+        url = f'{self.url_recipes}{self.recipe.pk}/'
+
+        def toggle():
+            for action in ('favorite', 'shopping_cart'):
+                self.client.delete(f'{url}{action}/')
+                self.client.post(f'{url}{action}/')
+            self.client.delete(f'/api/users/{self.author.pk}/subscribe/')
+            self.client.post(f'/api/users/{self.author.pk}/subscribe/')
+
+        self.assertNoRelationScans(toggle)
+
+    def test_recipe_delete(self):
+        '''Каскадное удаление находит связи рецепта по индексу'''
+        self.client.force_authenticate(self.author)
+        self.assertNoRelationScans(lambda: self.client.delete(
+            f'{self.url_recipes}{self.recipe.pk}/'
+        ))
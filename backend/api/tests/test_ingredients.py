@@ -0,0 +1,49 @@
+from django.core.cache import caches
+from rest_framework.test import APIClient, APITestCase
+
+from api.tests.common import on_commit_callbacks
+from foodgram.models import Ingredients
+
+NAMES = (
+    'Соль', 'соевый соус', 'Сода', 'Морская соль', 'Перец', 'сахар',
+)
+
+
+class TestIngredientsAutocomplete(APITestCase):
+    url_ingredients = '/api/ingredients/'
+
+    @classmethod
+    def setUpTestData(cls):
+        Ingredients.objects.bulk_create(
+            Ingredients(name=name, measuring_unit='г') for name in NAMES
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        caches['reference'].clear()
+
+    def names(self, **params):
+        response = self.client.get(self.url_ingredients, params)
+        return [ingredient['name'] for ingredient in response.data]
+
+    def test_prefix_then_contains(self):
+        '''Сначала совпадения по началу без учёта регистра, потом вхождения'''
+        self.assertEqual(
+            self.names(name='со'),
+            ['Сода', 'соевый соус', 'Соль', 'Морская соль']
+        )
+
+    def test_limit(self):
+        self.assertEqual(
+            self.names(name='СО', limit=2), ['Сода', 'соевый соус']
+        )
+
+    def test_index_invalidation(self):
+        '''Новый ингредиент сразу попадает в выдачу'''
+        self.names(name='са')
+        with on_commit_callbacks():
+            Ingredients.objects.create(name='Сало', measuring_unit='г')
+        self.assertEqual(self.names(name='са'), ['Сало', 'сахар'])
+
+    def test_without_name(self):
+        self.assertEqual(len(self.names()), len(NAMES))
@@ -0,0 +1,88 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from rest_framework.test import APITestCase
+
+from foodgram.management.commands.load_ingredients import CSVStream
+from foodgram.models import Ingredients
+
+ROWS = [
+    {'name': 'Абрикосовое варенье', 'measuring_unit': 'г'},
+    {'name': 'Соль', 'measuring_unit': 'щепотка'},
+    {'name': 'Молоко', 'measurement_unit': 'мл'},
+]
+
+
+class TestLoadIngredients(APITestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def write(self, filename, content):
+        path = os.path.join(self.directory, filename)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def load(self, path):
+        call_command('load_ingredients', path, stdout=io.StringIO())
+        return set(Ingredients.objects.values_list('name', 'measuring_unit'))
+
+    def test_json_object_across_chunks(self):
+        '''Объект, разорванный границей чтения, дочитывается целиком'''
+        path = self.write('ingredients.json', json.dumps(
+            ROWS, ensure_ascii=False
+        ))
+        with mock.patch(
+            'foodgram.management.commands.load_ingredients.JSON_CHUNK_SIZE',
+            16
+        ):
+            self.assertEqual(self.load(path), {
+                ('Абрикосовое варенье', 'г'), ('Соль', 'щепотка'),
+                ('Молоко', 'мл'),
+            })
+
+    def test_duplicates_in_file(self):
+        path = self.write(
+            'ingredients.csv',
+            'name,measuring_unit\nСоль,г\nПерец,г\nСоль,г\nСоль,щепотка\n'
+        )
+        self.load(path)
+        self.assertEqual(Ingredients.objects.count(), 3)
+
+    def test_rerun(self):
+        '''Повторная загрузка того же файла ничего не добавляет'''
+        path = self.write('ingredients.json', json.dumps(ROWS))
+        loaded = self.load(path)
+        count = Ingredients.objects.count()
+        self.assertEqual(self.load(path), loaded)
+        self.assertEqual(Ingredients.objects.count(), count)
+
+    def test_truncated_file(self):
+        '''Оборванный файл — ошибка, и ничего не загружено'''
+        content = json.dumps(ROWS)
+        path = self.write('ingredients.json', content[:content.rindex('{')])
+        with self.assertRaises(CommandError):
+            self.load(path)
+        self.assertFalse(Ingredients.objects.exists())
+
+    def test_copy_stream(self):
+        '''Поток для COPY отдаёт CSV кусками, читая строки по мере нужды'''
+        rows = iter([('Соль', 'г'), ('Перец, чёрный', 'г'), ('Вода', 'мл')])
+        stream = CSVStream(rows)
+        self.assertEqual(stream.read(4), 'Соль')
+        self.assertEqual(stream.count, 1)
+        content = stream.read(4) + stream.read()
+        self.assertEqual(stream.count, 3)
+        self.assertEqual(
+            'Соль' + content, 'Соль,г\r\n"Перец, чёрный",г\r\nВода,мл\r\n'
+        )
+        self.assertEqual(stream.read(4), '')
@@ -0,0 +1,104 @@
+import io
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient, APITestCase
+
+from api.tests.common import RECIPE_DATA, USER_DATA
+from foodgram import popularity
+from foodgram.models import Favorites, Recipes, ShopLists
+from users.models import User
+
+
+class TestPopularity(APITestCase):
+    url_recipes = '/api/recipes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**USER_DATA)
+        cls.quiet, cls.fresh, cls.old, cls.mixed = [
+            Recipes.objects.create(author=cls.user, **RECIPE_DATA).pk
+            for _ in range(4)
+        ]
+        now = timezone.now()
+        Favorites.objects.create(user=cls.user, recipe_id=cls.fresh)
+        ShopLists.objects.create(user=cls.user, recipe_id=cls.old)
+        ShopLists.objects.filter(recipe=cls.old).update(
+            created=now - timedelta(days=14)
+        )
+        Favorites.objects.create(user=cls.user, recipe_id=cls.mixed)
+        ShopLists.objects.create(user=cls.user, recipe_id=cls.mixed)
+        Favorites.objects.filter(recipe=cls.mixed).update(
+            created=now - timedelta(days=7)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_scores(self):
+        '''Вес добавления вдвое падает за неделю, корзина весит вдвое'''
+        scores = popularity.scores()
+        self.assertNotIn(self.quiet, scores)
+        self.assertAlmostEqual(scores[self.fresh], 1, places=3)
+        self.assertAlmostEqual(scores[self.old], 0.5, places=3)
+        self.assertAlmostEqual(scores[self.mixed], 2.5, places=3)
+
+    def test_ordering(self):
+        call_command('compute_popularity', stdout=io.StringIO())
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(
+                self.url_recipes, {'ordering': 'popular'}
+            )
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.mixed, self.fresh, self.old, self.quiet]
+        )
+        self.assertFalse(any(
+            table in query['sql'] for query in context.captured_queries
+            for table in (Favorites._meta.db_table, ShopLists._meta.db_table)
+        ))
+        self.assertEqual(self.client.get(
+            self.url_recipes, {'ordering': 'unknown'}
+        ).status_code, 400)
+
+    def test_cursor(self):
+        call_command('compute_popularity', stdout=io.StringIO())
+        ids = []
+        url = f'{self.url_recipes}?ordering=popular&cursor=&limit=3'
+        while url:
+            data = self.client.get(url).data
+            ids += [recipe['id'] for recipe in data['results']]
+            url = data['next']
+        self.assertEqual(ids, [self.mixed, self.fresh, self.old, self.quiet])
+
+    def test_cursor_ties(self):
+        '''Рецепты с одинаковым счётом не теряются и не повторяются'''
+        Recipes.objects.bulk_create(
+            Recipes(author=self.user, **RECIPE_DATA) for _ in range(5)
+        )
+        call_command('compute_popularity', stdout=io.StringIO())
+        pages = []
+        url = f'{self.url_recipes}?ordering=popular&cursor=&limit=2'
+        while url:
+            data = self.client.get(url).data
+            pages.append([recipe['id'] for recipe in data['results']])
+            url = data['next']
+        expected = [self.mixed, self.fresh, self.old] + sorted(
+            Recipes.objects.filter(popularity=0).values_list('pk', flat=True),
+            reverse=True
+        )
+        self.assertEqual(sum(pages, []), expected)
+        url = data['previous']
+        for page in reversed(pages[:-1]):
+            data = self.client.get(url).data
+            self.assertEqual(
+                [recipe['id'] for recipe in data['results']], page
+            )
+            url = data['previous']
+        self.assertIsNone(url)
+        self.assertEqual(self.client.get(
+            self.url_recipes, {'ordering': 'popular', 'cursor': 'cD1vb3Bz'}
+        ).status_code, 404)
@@ -0,0 +1,188 @@
+import shutil
+import tempfile
+
+from django.core.cache import caches
+from django.test import override_settings
+from rest_framework.test import APIClient, APITestCase
+
+from api.tests.common import (IMAGE_DATA, INGREDIENT_DATA, RECIPE_DATA,
+                              TAG_1_DATA, TAG_2_DATA, USER_DATA,
+                              on_commit_callbacks)
+from foodgram import reference
+from foodgram.models import (Ingredients, RecipeIngredients, Recipes,
+                             RecipeTags, Subscriptions, Tags)
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TestRecipesQueries(APITestCase):
+    '''
+    Фиксирует число запросов к БД у эндпоинтов рецептов,
+    чтобы возврат N+1 в сериализаторах ломал тесты
+    '''
+
+    url_recipes = '/api/recipes/'
+    url_recipe = '/api/recipes/{}/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**USER_DATA)
+        cls.tags = [
+            Tags.objects.create(**TAG_1_DATA),
+            Tags.objects.create(**TAG_2_DATA),
+        ]
+        cls.ingredients = [
+            Ingredients.objects.create(**INGREDIENT_DATA),
+            Ingredients.objects.create(name='Морковь', measuring_unit='г'),
+        ]
+        for _ in range(6):
+            cls.create_recipe()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    @classmethod
+    def create_recipe(cls):
+        recipe = Recipes.objects.create(author=cls.user, **RECIPE_DATA)
+        RecipeTags.objects.bulk_create(
+            RecipeTags(recipe=recipe, tag=tag) for tag in cls.tags
+        )
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(recipe=recipe, ingredient=ingredient, amount=1)
+            for ingredient in cls.ingredients
+        )
+        return recipe
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        caches['reference'].clear()
+        reference.tags.all()
+        reference.ingredients.all()
+
+    def recipe_payload(self):
+        return {
+            'tags': [tag.id for tag in self.tags],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 5}
+                for ingredient in self.ingredients
+            ],
+            'name': 'Борщ', 'text': 'Сварить свеклу', 'cooking_time': 60,
+            'image': IMAGE_DATA,
+        }
+
+    def test_list(self):
+        '''Список: выборка, подсчёт страниц, теги, ингредиенты, подписки'''
+        with self.assertNumQueries(5):
+            self.client.get(self.url_recipes)
+        for _ in range(6):
+            self.create_recipe()
+        with self.assertNumQueries(5):
+            self.client.get(self.url_recipes, {'limit': 12})
+
+    def test_retrieve(self):
+        '''Рецепт: выборка, теги, ингредиенты, подписки'''
+        recipe = Recipes.objects.first()
+        with self.assertNumQueries(4):
+            self.client.get(self.url_recipe.format(recipe.id))
+
+    def test_create(self):
+        '''
+        Создание рецепта с двумя тегами и двумя ингредиентами
+        в одной транзакции (SAVEPOINT и RELEASE внутри теста)
+        и счётчик рецептов автора. В SQLite документ для поиска
+        дополнительно пишется в таблицу FTS5. Имя файла изображения
+        блокируется двумя запросами
+        '''
+        with self.assertNumQueries(13):
+            response = self.client.post(
+                self.url_recipes, self.recipe_payload()
+            )
+        self.assertEqual(response.status_code, 201)
+
+    def test_update(self):
+        '''
+        Редактирование рецепта с двумя тегами и двумя ингредиентами:
+        тэги не меняются, количества обновляются одним UPDATE,
+        документ для поиска — в той же строке и в FTS5,
+        новое изображение блокируется двумя запросами
+        '''
+        recipe = Recipes.objects.first()
+        with self.assertNumQueries(15):
+            response = self.client.patch(
+                self.url_recipe.format(recipe.id), self.recipe_payload()
+            )
+        self.assertEqual(response.status_code, 200)
+
+    def test_unknown_tag_and_ingredient(self):
+        '''Несуществующие тег и ингредиент отклоняются без запросов к БД'''
+        payload = self.recipe_payload()
+        payload['tags'] = [0]
+        payload['ingredients'] = [{'id': 0, 'amount': 1}]
+        with self.assertNumQueries(0):
+            response = self.client.post(self.url_recipes, payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tags', response.data)
+        self.assertIn('ingredients', response.data)
+
+    def test_reference_endpoints(self):
+        '''Тэги и ингредиенты отдаются из кэша, изменения видны сразу'''
+        for url in ('/api/tags/', '/api/ingredients/', '/api/tags/1/'):
+            with self.subTest(url=url):
+                with self.assertNumQueries(0):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+        with on_commit_callbacks():
+            Tags.objects.get(pk=1).delete()
+        self.assertEqual(self.client.get('/api/tags/1/').status_code, 404)
+        self.assertEqual(len(self.client.get('/api/tags/').data), 1)
+
+
+class TestSubscriptionsQueries(APITestCase):
+    url_subscriptions = '/api/users/subscriptions/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**USER_DATA)
+        for index in range(4):
+            cls.add_author(index)
+
+    @classmethod
+    def add_author(cls, index):
+        author = User.objects.create_user(
+            username=f'author{index}', email=f'author{index}@god.com',
+            password='12345'
+        )
+        for _ in range(index + 1):
+            Recipes.objects.create(author=author, **RECIPE_DATA)
+        Subscriptions.objects.create(subscriber=cls.user, author=author)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_feed(self):
+        '''Лента подписок: число рецептов и срез по recipes_limit'''
+        response = self.client.get(
+            self.url_subscriptions, {'recipes_limit': 2}
+        )
+        for index, author in enumerate(response.data['results']):
+            with self.subTest(author=author['username']):
+                self.assertTrue(author['is_subscribed'])
+                self.assertEqual(author['recipes_count'], index + 1)
+                self.assertEqual(len(author['recipes']), min(index + 1, 2))
+
+    def test_feed_query_count(self):
+        '''Лента подписок: подсчёт, авторы, рецепты авторов страницы'''
+        with self.assertNumQueries(3):
+            self.client.get(self.url_subscriptions, {'recipes_limit': 2})
+        for index in range(4, 8):
+            self.add_author(index)
+        with self.assertNumQueries(3):
+            self.client.get(
+                self.url_subscriptions, {'recipes_limit': 2, 'limit': 8}
+            )
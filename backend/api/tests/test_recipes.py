@@ -0,0 +1,236 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import DatabaseError, connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase
+
+from api.serializers import RecipesSerializer
+from api.tests.common import (IMAGE_DATA, INGREDIENT_DATA, RECIPE_DATA,
+                              TAG_1_DATA, TAG_2_DATA, USER_DATA)
+from foodgram.models import (Favorites, Ingredients, RecipeIngredients,
+                             Recipes, RecipeTags, ShopLists, Subscriptions,
+                             Tags)
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+RELATION_TABLES = (
+    Favorites._meta.db_table, ShopLists._meta.db_table,
+    Subscriptions._meta.db_table,
+)
+
+
+class TestRecipesFlags(APITestCase):
+    url_recipes = '/api/recipes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**USER_DATA)
+        cls.author = User.objects.create_user(
+            username='Author', email='author@god.com', password='12345'
+        )
+        tag = Tags.objects.create(**TAG_1_DATA)
+        ingredient = Ingredients.objects.create(**INGREDIENT_DATA)
+        for index in range(8):
+            recipe = Recipes.objects.create(author=cls.author, **RECIPE_DATA)
+            RecipeTags.objects.create(recipe=recipe, tag=tag)
+            RecipeIngredients.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=index + 1
+            )
+            if index % 2:
+                Favorites.objects.create(user=cls.user, recipe=recipe)
+            else:
+                ShopLists.objects.create(user=cls.user, recipe=recipe)
+        Subscriptions.objects.create(subscriber=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def relation_queries(self, limit):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(self.url_recipes, {'limit': limit})
+        self.assertEqual(len(response.data['results']), limit)
+        return [
+            query['sql'] for query in context.captured_queries
+            if any(table in query['sql'] for table in RELATION_TABLES)
+        ]
+
+    def test_flags_values(self):
+        '''Флаги избранного, корзины и подписки считаются верно'''
+        results = self.client.get(self.url_recipes).data['results']
+        for index, recipe in enumerate(results):
+            with self.subTest(recipe=recipe['id']):
+                self.assertEqual(recipe['is_favorited'], bool(index % 2))
+                self.assertEqual(
+                    recipe['is_in_shopping_cart'], not index % 2
+                )
+                self.assertTrue(recipe['author']['is_subscribed'])
+
+    def test_flags_query_count(self):
+        '''Число запросов за флагами не зависит от размера страницы'''
+        self.assertEqual(
+            len(self.relation_queries(2)), len(self.relation_queries(8))
+        )
+
+    def test_anonymous_flags(self):
+        '''Аноним получает флаги без обращения к таблицам связей'''
+        self.client.force_authenticate(None)
+        self.assertEqual(self.relation_queries(8), [])
+        response = self.client.get(self.url_recipes)
+        self.assertFalse(any(
+            recipe['is_favorited'] or recipe['is_in_shopping_cart']
+            or recipe['author']['is_subscribed']
+            for recipe in response.data['results']
+        ))
+
+
+class TestRecipesCursorPagination(APITestCase):
+    url_recipes = '/api/recipes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(**USER_DATA)
+        Recipes.objects.bulk_create(
+            Recipes(author=cls.author, **RECIPE_DATA) for _ in range(7)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_cursor_pages(self):
+        '''Курсор обходит все рецепты без повторов и без COUNT'''
+        ids = []
+        url = self.url_recipes + '?cursor=&limit=3'
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                data = self.client.get(url).data
+            self.assertNotIn('COUNT', ' '.join(
+                query['sql'] for query in context.captured_queries
+            ))
+            self.assertNotIn('count', data)
+            ids += [recipe['id'] for recipe in data['results']]
+            if len(ids) == 3:
+                Recipes.objects.create(author=self.author, **RECIPE_DATA)
+            url = data['next']
+        self.assertEqual(ids, sorted(Recipes.objects.values_list(
+            'id', flat=True
+        )))
+
+    def test_page_number_still_available(self):
+        data = self.client.get(self.url_recipes, {'page': 2, 'limit': 3}).data
+        self.assertEqual(data['count'], 7)
+        self.assertEqual(len(data['results']), 3)
+
+
+class TestRecipesTagsFilter(APITestCase):
+    url_recipes = '/api/recipes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(**USER_DATA)
+        breakfast = Tags.objects.create(**TAG_1_DATA)
+        dinner = Tags.objects.create(**TAG_2_DATA)
+        tags = ((breakfast,), (dinner,), (breakfast, dinner), ())
+        for recipe_tags in tags:
+            recipe = Recipes.objects.create(author=author, **RECIPE_DATA)
+            RecipeTags.objects.bulk_create(
+                RecipeTags(recipe=recipe, tag=tag) for tag in recipe_tags
+            )
+        cls.recipes = list(Recipes.objects.values_list('id', flat=True))
+
+    def setUp(self):
+        self.client = APIClient()
+        caches['reference'].clear()
+
+    def ids(self, tags):
+        response = self.client.get(self.url_recipes, {'tags': tags})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_filter(self):
+        '''Рецепты с любым из тэгов, без дублей'''
+        first, second, both, _ = self.recipes
+        self.assertEqual(self.ids(['breakfast']), [first, both])
+        self.assertEqual(
+            self.ids(['breakfast', 'dinner']), [first, second, both]
+        )
+        self.assertEqual(self.ids(['unknown']), [])
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TestRecipesEdit(APITestCase):
+    url_recipes = '/api/recipes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**USER_DATA)
+        cls.tags = [
+            Tags.objects.create(**TAG_1_DATA),
+            Tags.objects.create(**TAG_2_DATA),
+        ]
+        cls.ingredients = [
+            Ingredients.objects.create(**INGREDIENT_DATA),
+            Ingredients.objects.create(name='Морковь', measuring_unit='г'),
+            Ingredients.objects.create(name='Свекла', measuring_unit='г'),
+        ]
+        cls.recipe = Recipes.objects.create(author=cls.user, **RECIPE_DATA)
+        RecipeTags.objects.create(recipe=cls.recipe, tag=cls.tags[0])
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(recipe=cls.recipe, ingredient=ingredient,
+                              amount=1)
+            for ingredient in cls.ingredients[:2]
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        caches['reference'].clear()
+
+    def test_update_diff(self):
+        '''Неизменённые строки сохраняются, лишние удаляются'''
+        kept, removed, added = self.ingredients
+        row = RecipeIngredients.objects.get(ingredient=kept)
+        response = self.client.patch(
+            f'{self.url_recipes}{self.recipe.pk}/', {
+                'tags': [self.tags[1].pk],
+                'ingredients': [
+                    {'id': kept.pk, 'amount': 1},
+                    {'id': added.pk, 'amount': 3},
+                ],
+            }, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            RecipeIngredients.objects.get(ingredient=kept).pk, row.pk
+        )
+        self.assertEqual(dict(RecipeIngredients.objects.filter(
+            recipe=self.recipe
+        ).values_list('ingredient', 'amount')), {kept.pk: 1, added.pk: 3})
+        self.assertEqual(list(RecipeTags.objects.filter(
+            recipe=self.recipe
+        ).values_list('tag', flat=True)), [self.tags[1].pk])
+
+    def test_create_is_atomic(self):
+        '''Ошибка при записи тэгов не оставляет рецепт без них'''
+        payload = {
+            'tags': [self.tags[0].pk],
+            'ingredients': [{'id': self.ingredients[0].pk, 'amount': 1}],
+            'name': 'Борщ', 'text': 'Сварить свеклу', 'cooking_time': 60,
+            'image': IMAGE_DATA,
+        }
+        with mock.patch.object(
+            RecipesSerializer, 'create_tags', side_effect=DatabaseError
+        ):
+            with self.assertRaises(DatabaseError):
+                self.client.post(self.url_recipes, payload, format='json')
+        self.assertEqual(Recipes.objects.count(), 1)
+        self.assertEqual(RecipeIngredients.objects.count(), 2)
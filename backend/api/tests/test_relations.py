@@ -0,0 +1,133 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APITestCase
+
+from api.tests.common import INGREDIENT_DATA, RECIPE_DATA, USER_DATA
+from foodgram.models import (Favorites, Ingredients, RecipeIngredients,
+                             Recipes, ShopLists, ShopListTotals, Subscriptions)
+from users.models import User
+
+
+class TestRelations(APITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**USER_DATA)
+        cls.author = User.objects.create_user(
+            username='Author', email='author@god.com', password='12345'
+        )
+        cls.recipe = Recipes.objects.create(author=cls.author, **RECIPE_DATA)
+        cls.url_favorite = f'/api/recipes/{cls.recipe.pk}/favorite/'
+        cls.url_subscribe = f'/api/users/{cls.author.pk}/subscribe/'
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_create(self):
+        '''
+        Объект читается один раз, связь добавляется одним INSERT после
+        блокировки пользователя, счётчик сдвигается одним UPDATE в той
+        же транзакции
+        '''
+        with self.assertNumQueries(6):
+            response = self.client.post(self.url_favorite)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['id'], self.recipe.pk)
+        self.assertTrue(Favorites.objects.filter(
+            user=self.user, recipe=self.recipe
+        ).exists())
+        response = self.client.post(self.url_favorite)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Favorites.objects.count(), 1)
+
+    def test_delete(self):
+        Favorites.objects.create(user=self.user, recipe=self.recipe)
+        with self.assertNumQueries(5):
+            response = self.client.delete(self.url_favorite)
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.delete(
+            self.url_favorite
+        ).status_code, 400)
+        self.assertEqual(self.client.delete(
+            '/api/recipes/0/favorite/'
+        ).status_code, 404)
+
+    def test_subscribe(self):
+        response = self.client.post(self.url_subscribe)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data['is_subscribed'])
+        self.assertEqual(response.data['recipes_count'], 1)
+        self.assertEqual(self.client.post(
+            f'/api/users/{self.user.pk}/subscribe/'
+        ).status_code, 400)
+        self.assertEqual(Subscriptions.objects.count(), 1)
+
+
+class TestBulkRelations(APITestCase):
+    url_cart = '/api/recipes/shopping_cart/'
+    url_favorite = '/api/recipes/favorite/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**USER_DATA)
+        cls.ingredient = Ingredients.objects.create(**INGREDIENT_DATA)
+        cls.recipes = []
+        for index in range(6):
+            recipe = Recipes.objects.create(author=cls.user, **RECIPE_DATA)
+            RecipeIngredients.objects.create(
+                recipe=recipe, ingredient=cls.ingredient, amount=index + 1
+            )
+            cls.recipes.append(recipe.pk)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def total(self):
+        return ShopListTotals.objects.filter(
+            user=self.user, ingredient=self.ingredient
+        ).values_list('amount', flat=True).first()
+
+    def test_add_and_remove(self):
+        first, second, *_ = self.recipes
+        ShopLists.objects.create(user=self.user, recipe_id=first)
+        response = self.client.post(
+            self.url_cart, {'ids': [first, second, 999, second]},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(result['id'], result['status']) for result in response.data],
+            [(first, 'exists'), (second, 'added'), (999, 'not_found')]
+        )
+        self.assertEqual(response.data[1]['recipe']['id'], second)
+        self.assertEqual(self.total(), 3)
+        response = self.client.delete(
+            self.url_cart, {'ids': [first, 999, self.recipes[2]]},
+            format='json'
+        )
+        self.assertEqual(
+            [result['status'] for result in response.data],
+            ['removed', 'not_found', 'missing']
+        )
+        self.assertEqual(self.total(), 2)
+
+    def test_query_count(self):
+        '''Число запросов не зависит от размера пакета'''
+        counts = []
+        for ids in (self.recipes[:1], self.recipes[1:]):
+            with CaptureQueriesContext(connection) as context:
+                self.client.post(
+                    self.url_favorite, {'ids': ids}, format='json'
+                )
+            counts.append(len(context))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(Favorites.objects.count(), len(self.recipes))
+
+    def test_validation(self):
+        for data in ({}, {'ids': []}, {'ids': ['x']}):
+            with self.subTest(data=data):
+                self.assertEqual(self.client.post(
+                    self.url_favorite, data, format='json'
+                ).status_code, 400)
@@ -0,0 +1,82 @@
+import io
+import shutil
+import tempfile
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APIClient, APITestCase
+
+from api.tests.common import (IMAGE_DATA, INGREDIENT_DATA, TAG_1_DATA,
+                              USER_DATA, on_commit_callbacks)
+from foodgram.models import Ingredients, Recipes, Tags
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TestSearch(APITestCase):
+    url_recipes = '/api/recipes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**USER_DATA)
+        cls.tag = Tags.objects.create(**TAG_1_DATA)
+        cls.cabbage = Ingredients.objects.create(**INGREDIENT_DATA)
+        cls.beet = Ingredients.objects.create(
+            name='Свёкла', measuring_unit='г'
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        caches['reference'].clear()
+
+    def create(self, name, text, ingredient):
+        response = self.client.post(self.url_recipes, {
+            'name': name, 'text': text, 'cooking_time': 10,
+            'image': IMAGE_DATA, 'tags': [self.tag.pk],
+            'ingredients': [{'id': ingredient.pk, 'amount': 100}],
+        })
+        return response.data['id']
+
+    def found(self, query):
+        response = self.client.get(self.url_recipes, {'search': query})
+        return {recipe['id'] for recipe in response.data['results']}
+
+    def test_search(self):
+        shchi = self.create('Щи', 'Сварить на медленном огне', self.cabbage)
+        borsch = self.create('Борщ', 'Сварить и настоять', self.beet)
+        self.assertEqual(self.found('щи'), {shchi})
+        self.assertEqual(self.found('свар'), {shchi, borsch})
+        self.assertEqual(self.found('свёкла настоять'), {borsch})
+        self.assertEqual(self.found('капуста борщ'), set())
+        self.assertEqual(self.found('"*'), {shchi, borsch})
+
+    def test_incremental(self):
+        recipe = self.create('Щи', 'Сварить', self.cabbage)
+        self.client.patch(f'{self.url_recipes}{recipe}/', {
+            'name': 'Борщ', 'ingredients': [{'id': self.beet.pk, 'amount': 1}]
+        })
+        self.assertEqual(self.found('щи'), set())
+        self.assertEqual(self.found('борщ свёкла'), {recipe})
+        self.client.patch(f'{self.url_recipes}{recipe}/', {'text': 'Томить'})
+        self.assertEqual(self.found('борщ томить свёкла'), {recipe})
+        self.beet.name = 'Бурак'
+        with on_commit_callbacks():
+            self.beet.save()
+        self.assertEqual(self.found('бурак'), {recipe})
+        self.client.delete(f'{self.url_recipes}{recipe}/')
+        self.assertEqual(self.found('бурак'), set())
+
+    def test_rebuild(self):
+        recipe = self.create('Щи', 'Сварить', self.cabbage)
+        Recipes.objects.filter(pk=recipe).update(search_document='')
+        call_command('rebuild_search', stdout=io.StringIO())
+        self.assertEqual(self.found('капуста'), {recipe})
@@ -0,0 +1,174 @@
+import io
+import re
+import shutil
+import tempfile
+
+from django.core.management import CommandError, call_command
+from django.test import override_settings
+from rest_framework.test import APIClient, APITestCase
+
+from api.tests.common import (IMAGE_DATA, INGREDIENT_DATA, RECIPE_DATA,
+                              TAG_1_DATA, USER_DATA)
+from foodgram.models import (Ingredients, RecipeIngredients, Recipes,
+                             ShopLists, ShopListTotals, Tags)
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class TestShoplist(APITestCase):
+    url_download = '/api/recipes/download_shopping_cart/'
+    url_cart = '/api/recipes/{}/shopping_cart/'
+    url_recipe = '/api/recipes/{}/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(**USER_DATA)
+        cabbage = Ingredients.objects.create(**INGREDIENT_DATA)
+        carrot = Ingredients.objects.create(name='Морковь', measuring_unit='г')
+        cls.ingredients = (cabbage, carrot)
+        for amount in (100, 250):
+            recipe = Recipes.objects.create(author=cls.user, **RECIPE_DATA)
+            RecipeIngredients.objects.create(
+                recipe=recipe, ingredient=cabbage, amount=amount
+            )
+            RecipeIngredients.objects.create(
+                recipe=recipe, ingredient=carrot, amount=1
+            )
+            ShopLists.objects.create(user=cls.user, recipe=recipe)
+        ShopListTotals.objects.rebuild()
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def download(self, format):
+        response = self.client.get(self.url_download, {'format': format})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_txt(self):
+        '''Суммы ингредиентов считаются по всем рецептам корзины'''
+        self.assertEqual(
+            self.download('txt').decode(),
+            '1. Капуста: 350 г\n2. Морковь: 2 г\n'
+        )
+
+    def test_csv(self):
+        self.assertEqual(
+            self.download('csv').decode(),
+            'Капуста,350,г\r\nМорковь,2,г\r\n'
+        )
+
+    def test_pdf_pages(self):
+        '''Длинный список переносится на новые страницы'''
+        recipe = Recipes.objects.first()
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(
+                recipe=recipe, amount=1, ingredient=Ingredients.objects.create(
+                    name=f'Специя {index}', measuring_unit='г'
+                )
+            ) for index in range(80)
+        )
+        ShopListTotals.objects.rebuild()
+        content = self.download('pdf')
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertEqual(len(re.findall(rb'/Type /Page\b', content)), 3)
+
+    def test_default_and_unknown_format(self):
+        response = self.client.get(self.url_download)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        response = self.client.get(self.url_download, {'format': 'xml'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_anonymous(self):
+        self.client.force_authenticate(None)
+        response = self.client.get(self.url_download, {'format': 'csv'})
+        self.assertEqual(response.status_code, 401)
+
+    def totals(self):
+        return dict(self.user.shoplist_totals.values_list(
+            'ingredient__name', 'amount'
+        ))
+
+    def test_cart_updates_totals(self):
+        '''Добавление и удаление из корзины меняет только разницу'''
+        first, second = Recipes.objects.all()
+        self.client.delete(self.url_cart.format(first.id))
+        self.assertEqual(self.totals(), {'Капуста': 250, 'Морковь': 1})
+        self.client.delete(self.url_cart.format(second.id))
+        self.assertEqual(self.totals(), {})
+        self.client.post(self.url_cart.format(first.id))
+        self.assertEqual(self.totals(), {'Капуста': 100, 'Морковь': 1})
+
+    def test_recipe_update_and_delete_update_totals(self):
+        '''Правка и удаление рецепта переносятся в суммы корзин'''
+        first, second = Recipes.objects.all()
+        cabbage, carrot = self.ingredients
+        response = self.client.patch(self.url_recipe.format(first.id), {
+            'tags': [Tags.objects.create(**TAG_1_DATA).id],
+            'ingredients': [{'id': cabbage.id, 'amount': 10}],
+            'name': 'Щи', 'text': 'Сварить капусту', 'cooking_time': 30,
+            'image': IMAGE_DATA,
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.totals(), {'Капуста': 260, 'Морковь': 1})
+        self.client.delete(self.url_recipe.format(second.id))
+        self.assertEqual(self.totals(), {'Капуста': 10})
+
+    def test_model_changes_update_totals(self):
+        '''Правки строк в обход API, как в админке, меняют суммы'''
+        first, second = Recipes.objects.all()
+        row = RecipeIngredients.objects.get(
+            recipe=first, ingredient=self.ingredients[1]
+        )
+        row.amount = 5
+        row.save()
+        self.assertEqual(self.totals(), {'Капуста': 350, 'Морковь': 6})
+        ShopLists.objects.get(recipe=second).delete()
+        self.assertEqual(self.totals(), {'Капуста': 100, 'Морковь': 5})
+        row.delete()
+        self.assertEqual(self.totals(), {'Капуста': 100})
+        self.assertEqual(ShopListTotals.objects.verify(), set())
+
+    def test_author_deletion_updates_totals(self):
+        '''Удаление автора вычитает его рецепты из чужих корзин'''
+        author = User.objects.create_user(
+            username='Author', email='author@god.com', password='12345'
+        )
+        recipe = Recipes.objects.create(author=author, **RECIPE_DATA)
+        RecipeIngredients.objects.create(
+            recipe=recipe, amount=7, ingredient=Ingredients.objects.create(
+                name='Абрикосовое варенье', measuring_unit='г'
+            )
+        )
+        RecipeIngredients.objects.create(
+            recipe=recipe, ingredient=self.ingredients[0], amount=50
+        )
+        self.client.post(self.url_cart.format(recipe.id))
+        self.assertIn(
+            'Абрикосовое варенье: 7 г', self.download('txt').decode()
+        )
+        author.delete()
+        self.assertEqual(
+            self.download('txt').decode(),
+            '1. Капуста: 350 г\n2. Морковь: 2 г\n'
+        )
+        self.assertEqual(ShopListTotals.objects.verify(), set())
+
+    def test_rebuild_command(self):
+        '''Команда находит расхождения и пересчитывает суммы'''
+        call_command(
+            'rebuild_shoplist_totals', '--check', stdout=io.StringIO()
+        )
+        self.user.shoplist_totals.update(amount=1)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_shoplist_totals', '--check')
+        call_command('rebuild_shoplist_totals', stdout=io.StringIO())
+        self.assertEqual(self.totals(), {'Капуста': 350, 'Морковь': 2})
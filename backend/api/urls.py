@@ -3,9 +3,9 @@ from django.urls import include, path
 from djoser.views import UserViewSet
 from rest_framework import routers
 
-from api.views import (FavoritesView, IngredientsViewSet, RecipesViewSet,
-                       ShopingCart, SubscribeView, SubscriptionsViewSet,
-                       TagsViewSet)
+from api.views import (BulkFavoritesView, BulkShopingCart, FavoritesView,
+                       IngredientsViewSet, RecipesViewSet, ShopingCart,
+                       SubscribeView, SubscriptionsViewSet, TagsViewSet)
 
 router = routers.DefaultRouter()
 router.register('users/subscriptions', SubscriptionsViewSet, basename='subs')
@@ -16,6 +16,14 @@ router.register('ingredients', IngredientsViewSet, basename='ingredients')
 
 urlpatterns = [
     path('auth/', include('djoser.urls.authtoken')),
+    path(
+        'recipes/favorite/', BulkFavoritesView.as_view(),
+        name='favorites-bulk'
+    ),
+    path(
+        'recipes/shopping_cart/', BulkShopingCart.as_view(),
+        name='shoplist-bulk'
+    ),
     path('', include(router.urls)),
     path(
         'recipes/<int:pk>/favorite/', FavoritesView.as_view(),
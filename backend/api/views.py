@@ -1,62 +1,193 @@
+import time
+
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import (BooleanField, Exists, OuterRef, Prefetch,
+                              Subquery, Value)
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import response, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 
-from api.filters import IngredientsFilterSet, RecipesFilterSet
-from api.mixins import CreateDestroyView, ListRetrieve, ListView
+from api.autocomplete import autocomplete
+from api.filters import RecipesFilterSet, rank_by_ingredients
+from api.mixins import (BulkCreateDestroyView, CachedListRetrieve,
+                        ConditionalMixin, CreateDestroyView, ListView)
 from api.pagination import RecipesPagination
 from api.permissions import OwnerOnly
-from api.serializers import (IngredientsSerializer, RecipesForSubscribers,
-                             RecipesSerializer, SubscriptionSerializer,
-                             TagsSerializer)
-from api.utils import get_pdf
-from foodgram.models import (Favorites, Ingredients, Recipes, ShopLists,
-                             Subscriptions, Tags)
+from api.serializers import (IdsSerializer, IngredientsSerializer,
+                             RecipesCoverageSerializer, RecipesForSubscribers,
+                             RecipesListSerializer, RecipesSerializer,
+                             SubscriptionSerializer, TagsSerializer)
+from api.shoplist import (CSVRenderer, PDFRenderer, TextRenderer,
+                          get_shoplist_response)
+from foodgram import counters, reference
+from foodgram.models import (Favorites, Ingredients, RecipeIngredients,
+                             Recipes, ShopLists, ShopListTotals, Subscriptions,
+                             Tags)
+from foodgram.reference import relations_version
 
 User = get_user_model()
 
 
-class TagsViewSet(ListRetrieve):
+class TagsViewSet(CachedListRetrieve):
     queryset = Tags.objects.all()
+    reference = reference.tags
     serializer_class = TagsSerializer
     pagination_class = None
 
 
-class RecipesViewSet(viewsets.ModelViewSet):
-    queryset = Recipes.objects.all()
+class RecipesViewSet(ConditionalMixin, viewsets.ModelViewSet):
+    prefetch = (
+        Prefetch('tags', queryset=Tags.objects.all()),
+        Prefetch(
+            'recipeingredients_set',
+            queryset=RecipeIngredients.objects.select_related('ingredient')
+        ),
+    )
+    # Документ для поиска в ответ не входит и не читается
+    queryset = Recipes.objects.select_related('author').prefetch_related(
+        *prefetch
+    ).defer('search_document')
     serializer_class = RecipesSerializer
     permission_classes = [OwnerOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipesFilterSet
 
+    def get_queryset(self):
+        user = self.request.user
+        if not user.is_authenticated:
+            return self.queryset.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField())
+            )
+        return self.queryset.annotate(
+            is_favorited=Exists(
+                Favorites.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            is_in_shopping_cart=Exists(
+                ShopLists.objects.filter(user=user, recipe=OuterRef('pk'))
+            )
+        )
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return RecipesListSerializer
+        if self.action == 'cook':
+            return RecipesCoverageSerializer
+        return super().get_serializer_class()
+
+    def get_etag_parts(self):
+        '''
+        Версии рецептов, справочников и связей пользователя, а для
+        одного рецепта ещё и версия его избранного, от которой зависит
+        favorites_count: ETag проверяется без запросов к рецептам
+        '''
+        user = self.request.user
+        parts = (
+            reference.recipes.get(), reference.tags.version.get(),
+            reference.ingredients.version.get(), user.pk,
+            user.is_authenticated and relations_version(user).get()
+        )
+        if self.action != 'retrieve':
+            return parts
+        try:
+            pk = int(self.kwargs['pk'])
+        except ValueError:
+            return parts
+        return parts + (reference.favorites_version(pk).get(),)
+
+    def get_last_modified(self):
+        '''
+        Дата изменения рецепта; только для анонимов, так как флаги
+        пользователя от неё не зависят. Рецепт, изменённый в текущую
+        секунду, может измениться ещё раз в пределах той же секунды
+        Last-Modified, поэтому дата для него не отдаётся.
+        '''
+        if self.action != 'retrieve' or self.request.user.is_authenticated:
+            return None
+        try:
+            updated_at = Recipes.objects.filter(
+                pk=self.kwargs['pk']
+            ).values_list('updated_at', flat=True).first()
+        except ValueError:
+            return None
+        if updated_at is None or updated_at.timestamp() >= int(time.time()):
+            return None
+        return updated_at
+
+    def reload_instance(self, serializer):
+        '''
+        Перечитывает сохранённый рецепт через get_queryset, чтобы ответ
+        строился по предвыборке, а не запросами на каждый ингредиент
+        '''
+        serializer.instance = self.get_queryset().get(
+            pk=serializer.instance.pk
+        )
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
+        self.reload_instance(serializer)
+
+    def perform_update(self, serializer):
+        serializer.save()
+        self.reload_instance(serializer)
+
+    @action(detail=False, methods=['get'])
+    def cook(self, request):
+        '''
+        Что приготовить из ингредиентов ?ingredients=1&ingredients=2:
+        рецепты по убыванию доли ингредиентов, которые уже есть.
+        Фильтры списка рецептов тоже действуют.
+        '''
+        serializer = IdsSerializer(data={
+            'ingredients': request.query_params.getlist('ingredients')
+        }, field='ingredients')
+        serializer.is_valid(raise_exception=True)
+        queryset = rank_by_ingredients(
+            self.filter_queryset(self.get_queryset()),
+            serializer.validated_data['ingredients']
+        )
+        page = self.paginate_queryset(queryset)
+        return self.get_paginated_response(
+            self.get_serializer(page, many=True).data
+        )
 
     @action(
         detail=False, methods=['get'], url_name='download_shoplist',
         url_path='download_shopping_cart',
-        permission_classes=[IsAuthenticated]
+        permission_classes=[IsAuthenticated],
+        renderer_classes=[PDFRenderer, CSVRenderer, TextRenderer]
     )
     def download_shopping_cart(self, request):
-        results = request.user.shoplist.all().values(
-            'recipe__recipeingredients__ingredient__id',
-            'recipe__recipeingredients__ingredient__name',
-            'recipe__recipeingredients__ingredient__measuring_unit'
-        ).order_by(
-            'recipe__recipeingredients__ingredient__name'
-        ).annotate(count=Sum('recipe__recipeingredients__amount'))
-        return get_pdf(results)
+        return get_shoplist_response(
+            request.user, request.accepted_renderer.format
+        )
 
 
-class IngredientsViewSet(ListRetrieve):
+class IngredientsViewSet(CachedListRetrieve):
     queryset = Ingredients.objects.all()
+    reference = reference.ingredients
     serializer_class = IngredientsSerializer
     pagination_class = None
-    filter_backends = [DjangoFilterBackend]
-    filterset_class = IngredientsFilterSet
+
+    def get_limit(self):
+        try:
+            return max(int(self.request.query_params['limit']), 0)
+        except (KeyError, ValueError):
+            return None
+
+    def list_reference(self, request):
+        '''
+        С параметром name работает как автодополнение: сначала
+        ингредиенты, начинающиеся с name, затем содержащие его
+        '''
+        name = request.query_params.get('name')
+        if not name:
+            return super().list_reference(request)
+        return response.Response(self.get_serializer(
+            autocomplete(name, self.get_limit()), many=True
+        ).data)
 
 
 class ShopingCart(CreateDestroyView):
@@ -67,6 +198,39 @@ class ShopingCart(CreateDestroyView):
     fail_message = 'Этого рецепта нету в корзине'
     model = ShopLists
 
+    @transaction.atomic
+    def perform_create(self, data):
+        created = super().perform_create(data)
+        if created:
+            ShopListTotals.objects.add_recipe(data['user'], data['recipe_id'])
+        return created
+
+    @transaction.atomic
+    def perform_destroy(self, data):
+        deleted = super().perform_destroy(data)
+        if deleted:
+            ShopListTotals.objects.remove_recipe(
+                data['user'], data['recipe_id']
+            )
+        return deleted
+
+
+class BulkShopingCart(BulkCreateDestroyView):
+    input_class = IdsSerializer
+    representation_class = RecipesForSubscribers
+    user_field = 'user'
+    object_field = 'recipe'
+    object_model = Recipes
+    model = ShopLists
+
+    def perform_bulk_create(self, ids):
+        super().perform_bulk_create(ids)
+        ShopListTotals.objects.add_recipes(self.user(), ids)
+
+    def perform_bulk_destroy(self, ids):
+        ShopListTotals.objects.remove_recipes(self.user(), ids)
+        super().perform_bulk_destroy(ids)
+
 
 class FavoritesView(CreateDestroyView):
     representation_class = RecipesForSubscribers
@@ -75,6 +239,17 @@ class FavoritesView(CreateDestroyView):
     object_model = Recipes
     fail_message = 'У вас нету этого рецепта в избранном'
     model = Favorites
+    counter = staticmethod(counters.count_favorites)
+
+
+class BulkFavoritesView(BulkCreateDestroyView):
+    input_class = IdsSerializer
+    representation_class = RecipesForSubscribers
+    user_field = 'user'
+    object_field = 'recipe'
+    object_model = Recipes
+    model = Favorites
+    counter = staticmethod(counters.count_favorites)
 
 
 class SubscribeView(CreateDestroyView):
@@ -84,9 +259,15 @@ class SubscribeView(CreateDestroyView):
     object_field = 'author'
     object_model = User
     fail_message = 'Такой подписки не существует'
+    counter = staticmethod(counters.count_subscribers)
+
+    def get_second_queryset(self):
+        return super().get_second_queryset().annotate(
+            is_subscribed=Value(True, output_field=BooleanField())
+        )
 
     def post(self, request, pk):
-        if self.user() == self.get_second_object():
+        if self.user().pk == pk:
             return response.Response(
                 'Вы не можете подписаться на самого себя',
                 status=status.HTTP_400_BAD_REQUEST
@@ -99,7 +280,29 @@ class SubscriptionsViewSet(ListView):
     pagination_class = RecipesPagination
     permission_classes = [IsAuthenticated]
 
+    def get_recipes_limit(self):
+        try:
+            return max(int(self.request.query_params['recipes_limit']), 0)
+        except (KeyError, ValueError):
+            return None
+
     def get_queryset(self):
+        '''
+        Авторы с первыми recipes_limit рецептами каждого: рецепты всей
+        страницы подгружаются одним запросом, их число хранится у автора
+        '''
+        recipes = Recipes.objects.all()
+        limit = self.get_recipes_limit()
+        if limit is not None:
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipes.objects.filter(
+                    author=OuterRef('author')
+                ).values('pk')[:limit]
+            ))
         return User.objects.filter(
             id__in=self.request.user.subscribed.all().values('author')
+        ).annotate(
+            is_subscribed=Value(True, output_field=BooleanField())
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='feed_recipes')
         )
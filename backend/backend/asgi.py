@@ -0,0 +1,170 @@
+"""
+ASGI config for backend project.
+
+Django 2.2 does not speak ASGI itself (get_asgi_application appeared
+in 3.0), so the WSGI application runs in a thread pool behind a small
+adapter. The request body is read and the response is sent to the
+client on the event loop: a slow client holds a socket, not a thread
+and a database connection. Only responses streamed from the database
+keep their thread until the last chunk is sent.
+
+    GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker \\
+        gunicorn backend.asgi:application -c gunicorn.conf.py
+"""
+
+import asyncio
+import functools
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+from django.http import FileResponse
+
+from backend import db
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+
+BODY_IN_MEMORY = 1024 * 1024
+
+
+class ThreadPoolASGI:
+    '''
+    ASGI-приложение поверх WSGI: Django работает в пуле из threads
+    потоков, у каждого своё соединение с базой. Обычный ответ
+    целиком собирается в потоке и отправляется клиенту уже без него.
+    FileResponse (PDF корзины) к моменту возврата уже записан в файл
+    и тоже читается в потоке целиком. Остальные потоковые ответы
+    (CSV и TXT по серверному курсору) читаются и закрываются в одном
+    потоке от начала до конца: курсор привязан к соединению этого
+    потока. Поток ждёт отправки каждого куска, так что медленный
+    клиент занимает его до конца выгрузки.
+    '''
+
+    def __init__(self, wsgi_application, threads):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            threads, thread_name_prefix='django'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f'Unsupported scope type {scope["type"]}')
+        loop = asyncio.get_event_loop()
+
+        def send_from_thread(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        with SpooledTemporaryFile(max_size=BODY_IN_MEMORY) as body:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                body.write(message.get('body', b''))
+                if not message.get('more_body'):
+                    break
+            body.seek(0)
+            response = await self.run(
+                self.respond, self.environ(scope, body), send_from_thread
+            )
+        if response is None:
+            return
+        status, headers, content = response
+        await send({
+            'type': 'http.response.start', 'status': status,
+            'headers': headers,
+        })
+        await send({'type': 'http.response.body', 'body': content})
+
+    async def run(self, function, *args):
+        return await asyncio.get_event_loop().run_in_executor(
+            self.executor, functools.partial(function, *args)
+        )
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                return await send({'type': 'lifespan.shutdown.complete'})
+
+    def respond(self, environ, send):
+        '''
+        Вызывает Django в потоке пула. Возвращает статус, заголовки
+        и тело, а потоковый ответ из базы сам отправляет через send
+        и возвращает None
+        '''
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin1'), value.encode('latin1'))
+                for name, value in headers
+            ]
+
+        response = self.wsgi_application(environ, start_response)
+        try:
+            if (
+                not getattr(response, 'streaming', False)
+                or isinstance(response, FileResponse)
+            ):
+                return (
+                    started['status'], started['headers'],
+                    b''.join(response)
+                )
+            send({
+                'type': 'http.response.start',
+                'status': started['status'], 'headers': started['headers'],
+            })
+            for chunk in response:
+                send({
+                    'type': 'http.response.body', 'body': chunk,
+                    'more_body': True,
+                })
+            send({'type': 'http.response.body', 'body': b''})
+        finally:
+            response.close()
+
+    @staticmethod
+    def environ(scope, body):
+        server = scope.get('server') or ('localhost', 80)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode().decode(
+                'latin1'
+            ),
+            'PATH_INFO': scope['path'].encode().decode('latin1'),
+            'QUERY_STRING': scope['query_string'].decode('latin1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f'HTTP/{scope["http_version"]}',
+            'REMOTE_ADDR': (scope.get('client') or ('', 0))[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope['headers']:
+            name = name.decode('latin1').upper().replace('-', '_')
+            value = value.decode('latin1')
+            if name not in ('CONTENT_LENGTH', 'CONTENT_TYPE'):
+                name = f'HTTP_{name}'
+            if name in environ:
+                value = f'{environ[name]},{value}'
+            environ[name] = value
+        return environ
+
+
+application = get_wsgi_application()
+db.connect()
+application = ThreadPoolASGI(application, settings.ASGI_THREADS)
@@ -0,0 +1,46 @@
+'''
+Проверка постоянных соединений с базой перед запросом.
+
+С CONN_MAX_AGE соединение переживает запрос, и после перезапуска
+PostgreSQL или pgbouncer первый запрос воркера упал бы на мёртвом
+сокете. Соединение, простоявшее дольше DB_HEALTH_CHECK_IDLE секунд,
+проверяется через SELECT 1 и при ошибке закрывается: Django откроет
+новое при первом обращении.
+
+Обработчики подключает connect() из backend.wsgi и backend.asgi:
+проверка нужна только серверу, который обслуживает запросы.
+'''
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+
+
+def check_connections(**kwargs):
+    idle = settings.DB_HEALTH_CHECK_IDLE
+    if idle < 0:
+        return
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None:
+            continue
+        last_used = getattr(connection, 'last_used', now)
+        if now - last_used > idle and not connection.is_usable():
+            connection.close()
+
+
+def remember_connections(**kwargs):
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            connection.last_used = now
+
+
+def connect():
+    request_started.connect(
+        check_connections, dispatch_uid='backend.db.check_connections'
+    )
+    request_finished.connect(
+        remember_connections, dispatch_uid='backend.db.remember_connections'
+    )
@@ -80,15 +80,30 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'backend.wsgi.application'
 
+# Потоки, в которых backend.asgi выполняет Django: у каждого своё
+# соединение с базой, запросы сверх числа потоков ждут в очереди
+ASGI_THREADS = int(os.getenv('ASGI_THREADS', default=8))
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Соединение живёт DB_CONN_MAX_AGE секунд и переиспользуется воркером,
+# 0 — новое соединение на каждый запрос. Простоявшее дольше
+# DB_HEALTH_CHECK_IDLE секунд соединение проверяется перед запросом,
+# см. backend/db.py. DB_PGBOUNCER=True — база доступна через pgbouncer
+
+DB_CONN_MAX_AGE = int(os.getenv('DB_CONN_MAX_AGE', default=60))
+DB_HEALTH_CHECK_IDLE = int(os.getenv('DB_HEALTH_CHECK_IDLE', default=10))
+DB_PGBOUNCER = os.getenv('DB_PGBOUNCER', default='False') == 'True'
+
 if DEBUG:
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+            'NAME': os.getenv(
+                'SQLITE_PATH', default=os.path.join(BASE_DIR, 'db.sqlite3')
+            ),
         }
     }
 else:
@@ -99,10 +114,33 @@ else:
             'USER': os.getenv('POSTGRES_USER', default='postgres'),
             'PASSWORD': os.getenv('POSTGRES_PASSWORD', default='postgres'),
             'HOST': os.getenv('DB_HOST', default='db'),
-            'PORT': os.getenv('DB_PORT', default=5432)
+            'PORT': os.getenv('DB_PORT', default=5432),
+            # pgbouncer в режиме transaction не держит курсоры между
+            # транзакциями, поэтому iterator() читает без них
+            'DISABLE_SERVER_SIDE_CURSORS': DB_PGBOUNCER,
         }
     }
 
+DATABASES['default']['CONN_MAX_AGE'] = DB_CONN_MAX_AGE
+
+# Cache
+# Справочники тэгов и ингредиентов кэшируются в отдельном алиасе:
+# locmem для одного процесса, filebased/memcached для нескольких воркеров
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'reference': {
+        'BACKEND': os.getenv(
+            'REFERENCE_CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('REFERENCE_CACHE_LOCATION', default='reference'),
+        'TIMEOUT': None,
+    },
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -145,11 +183,31 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Images
+# Миниатюры и WebP-копии изображений рецептов: thread — пул потоков
+# в воркере после коммита, queue — обработку ведёт команда process_images
+
+IMAGE_PROCESSING = os.getenv('IMAGE_PROCESSING', default='thread')
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', default=2))
+THUMBNAIL_SIZE = (480, 480)
+IMAGE_MAX_BYTES = int(os.getenv('IMAGE_MAX_BYTES', default=5 * 1024 * 1024))
+IMAGE_MAX_SIDE = 6000
+IMAGE_MAX_PIXELS = 24_000_000
+
+# Token authentication
+# Токены кэшируются в памяти процесса на AUTH_TOKEN_LOCAL_TTL секунд;
+# AUTH_TOKEN_CACHE — алиас общего кэша для второго уровня, пусто — без него
+
+AUTH_TOKEN_LOCAL_TTL = int(os.getenv('AUTH_TOKEN_LOCAL_TTL', default=5))
+AUTH_TOKEN_LOCAL_SIZE = 1024
+AUTH_TOKEN_CACHE = os.getenv('AUTH_TOKEN_CACHE', default='')
+AUTH_TOKEN_SHARED_TTL = int(os.getenv('AUTH_TOKEN_SHARED_TTL', default=300))
+
 AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     'TEST_REQUEST_DEFAULT_FORMAT': 'json',
     'TEST_REQUEST_RENDERER_CLASSES': [
@@ -0,0 +1,175 @@
+'''
+WSGI против ASGI: запросы в секунду и p99 на списке рецептов
+и выгрузке корзины в PDF, а также на списке рецептов, пока --slow
+медленных клиентов передают заголовки запроса по байту.
+
+Оба сервера — gunicorn с одинаковым числом воркеров: синхронные
+воркеры (backend.wsgi) и воркеры uvicorn (backend.asgi) с пулом
+из ASGI_THREADS потоков. База — временный файл SQLite вместо
+PostgreSQL, он создаётся, заполняется и удаляется. Нужны gunicorn
+и uvicorn:
+
+    python -m benchmarks.asgi_vs_wsgi
+
+Без медленных клиентов сам адаптер ничего не стоит, но воркер
+uvicorn принимает все keep-alive соединения сразу и выполняет до
+ASGI_THREADS запросов одновременно, а синхронный — по одному.
+Если воркеров больше, чем ядер, они делят процессор, и хвост
+задержек ASGI растёт: сравнивайте с --workers не больше числа ядер.
+'''
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from benchmarks.load_test import (BACKEND_DIR, HEADER, PORT, load, report,
+                                  running)
+
+ENDPOINTS = (
+    ('recipes', '/api/recipes/'),
+    ('shopping cart PDF', '/api/recipes/download_shopping_cart/'),
+)
+SERVERS = (
+    ('wsgi', 'backend.wsgi:application', {}),
+    (
+        'asgi', 'backend.asgi:application',
+        {'GUNICORN_WORKER_CLASS': 'uvicorn.workers.UvicornWorker'},
+    ),
+)
+SLOW_REQUEST = (
+    b'GET /api/recipes/ HTTP/1.1\r\nHost: 127.0.0.1\r\n'
+    b'X-Padding: ' + b'x' * 64 + b'\r\n\r\n'
+)
+SLOW_DELAY = 0.05
+RECIPES = 60
+CART = 20
+INGREDIENTS_PER_RECIPE = 5
+
+
+def seed():
+    '''Заполняет базу и печатает токен пользователя с корзиной'''
+    from benchmarks import common  # noqa: F401 isort:skip
+    from rest_framework.authtoken.models import Token
+
+    from foodgram.models import (Ingredients, RecipeIngredients, Recipes,
+                                 ShopLists, ShopListTotals)
+    from users.models import User
+
+    user = User.objects.create_user(
+        username='bench', email='bench@example.com', password='bench'
+    )
+    ingredients = [
+        Ingredients.objects.create(
+            name=f'Ингредиент {number}', measuring_unit='г'
+        )
+        for number in range(RECIPES)
+    ]
+    recipes = []
+    for number in range(RECIPES):
+        recipe = Recipes.objects.create(
+            author=user, name='Рецепт', text='Текст', cooking_time=1,
+            image='recipes/benchmark.png',
+            ingredients_count=INGREDIENTS_PER_RECIPE
+        )
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(
+                recipe=recipe, amount=10,
+                ingredient=ingredients[(number + step) % RECIPES]
+            ) for step in range(INGREDIENTS_PER_RECIPE)
+        )
+        recipes.append(recipe.pk)
+    ShopLists.objects.bulk_create(
+        ShopLists(user=user, recipe_id=pk) for pk in recipes[:CART]
+    )
+    ShopListTotals.objects.add_recipes(user, recipes[:CART])
+    print(Token.objects.create(user=user).key)
+
+
+def slow_client(deadline):
+    '''Раз за разом отправляет SLOW_REQUEST по байту в SLOW_DELAY секунд'''
+    while time.perf_counter() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', PORT)) as client:
+                for index in range(len(SLOW_REQUEST)):
+                    if time.perf_counter() >= deadline:
+                        return
+                    client.sendall(SLOW_REQUEST[index:index + 1])
+                    time.sleep(SLOW_DELAY)
+                client.recv(1024)
+        except OSError:
+            time.sleep(SLOW_DELAY)
+
+
+def load_with_slow_clients(url, args, headers):
+    deadline = time.perf_counter() + args.duration + 1
+    clients = [
+        threading.Thread(target=slow_client, args=(deadline,))
+        for _ in range(args.slow)
+    ]
+    for client in clients:
+        client.start()
+    time.sleep(1)
+    result = load(url, args.concurrency, args.duration, headers)
+    for client in clients:
+        client.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--seed', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument(
+        '--slow', type=int, default=4,
+        help='медленных клиентов в последнем замере, 0 — без него'
+    )
+    args = parser.parse_args()
+    if args.seed:
+        return seed()
+    with tempfile.TemporaryDirectory() as directory:
+        env = {
+            'SQLITE_PATH': os.path.join(directory, 'db.sqlite3'),
+            'GUNICORN_WORKERS': str(args.workers),
+            'SECRET': os.getenv('SECRET', 'benchmark'),
+            'ALLOWED_HOSTS': os.getenv('ALLOWED_HOSTS', '*'),
+        }
+        environ = {**os.environ, **env}
+        subprocess.run(
+            [sys.executable, 'manage.py', 'migrate', '-v', '0'],
+            cwd=BACKEND_DIR, env=environ, check=True
+        )
+        token = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.asgi_vs_wsgi', '--seed'],
+            cwd=BACKEND_DIR, env=environ, check=True,
+            stdout=subprocess.PIPE, universal_newlines=True
+        ).stdout.split()[-1]
+        headers = {'Authorization': f'Token {token}'}
+        print(HEADER)
+        for server, application, server_env in SERVERS:
+            command = [
+                'gunicorn', application, '-c', 'gunicorn.conf.py',
+                '--bind', f'127.0.0.1:{PORT}',
+            ]
+            with running(command, {**env, **server_env}):
+                for name, path in ENDPOINTS:
+                    url = f'http://127.0.0.1:{PORT}{path}'
+                    load(url, args.concurrency, 1, headers)
+                    report(f'{server} {name}', load(
+                        url, args.concurrency, args.duration, headers
+                    ))
+                if args.slow:
+                    url = f'http://127.0.0.1:{PORT}{ENDPOINTS[0][1]}'
+                    report(
+                        f'{server} {ENDPOINTS[0][0]}, {args.slow} slow',
+                        load_with_slow_clients(url, args, headers)
+                    )
+
+
+if __name__ == '__main__':
+    sys.exit(main())
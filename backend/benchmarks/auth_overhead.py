@@ -0,0 +1,69 @@
+'''
+Цена аутентификации по токену на один запрос API.
+
+TokenAuthentication делает запрос Token + User на каждый вызов,
+CachedTokenAuthentication находит пользователя в LRU процесса,
+а после его истечения — в общем кэше. Время — среднее на один
+authenticate() по лучшему из повторов, запросы — к базе за вызов.
+
+    python -m benchmarks.auth_overhead
+'''
+from benchmarks.common import test_database, timeit  # isort:skip
+
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api import authentication
+from users.models import User
+
+CALLS = 2_000
+
+
+def measure(authenticator, request, before=lambda: None):
+    def run():
+        for _ in range(CALLS):
+            before()
+            authenticator.authenticate(request)
+
+    before()
+    authenticator.authenticate(request)
+    with CaptureQueriesContext(connection) as context:
+        before()
+        authenticator.authenticate(request)
+    return timeit(run) * 1000 / CALLS, len(context.captured_queries)
+
+
+def main():
+    with test_database():
+        user = User.objects.create_user(
+            username='bench', email='bench@example.com', password='bench'
+        )
+        token = Token.objects.create(user=user)
+        request = Request(APIRequestFactory().get(
+            '/api/users/me/', HTTP_AUTHORIZATION=f'Token {token.key}'
+        ))
+        cases = (
+            ('TokenAuthentication', TokenAuthentication(), None),
+            ('Cached, LRU', authentication.CachedTokenAuthentication(), None),
+            (
+                'Cached, shared cache',
+                authentication.CachedTokenAuthentication(),
+                authentication.tokens.clear,
+            ),
+        )
+        print(f"{'class':>22} {'us/request':>12} {'queries':>8}")
+        with override_settings(DEBUG=False, AUTH_TOKEN_CACHE='default'):
+            for name, authenticator, before in cases:
+                elapsed, queries = measure(
+                    authenticator, request, before or (lambda: None)
+                )
+                print(f'{name:>22} {elapsed:>12.1f} {queries:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+'''
+Общие заготовки для бенчмарков: настройка Django и временная
+тестовая база, которая удаляется после замера.
+
+Запуск из папки backend/: python -m benchmarks.<имя>
+'''
+import os
+import time
+from contextlib import contextmanager
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+os.environ.setdefault('SECRET', 'benchmark')
+os.environ.setdefault('ALLOWED_HOSTS', '*')
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test import utils  # noqa: E402
+
+
+@contextmanager
+def test_database():
+    utils.setup_test_environment()
+    name = connection.creation.create_test_db(verbosity=0)
+    try:
+        yield name
+    finally:
+        connection.creation.destroy_test_db(name, verbosity=0)
+        utils.teardown_test_environment()
+
+
+def timeit(function, repeat=5):
+    '''Лучшее время из repeat запусков, в миллисекундах'''
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
@@ -0,0 +1,79 @@
+'''
+Подбор рецептов по имеющимся ингредиентам на 250k-1M строк
+RecipeIngredients.
+
+Запрос читает только списки рецептов переданных ингредиентов
+по индексу (ingredient, recipe), поэтому время зависит от того,
+в скольких рецептах эти ингредиенты встречаются, а не от размера
+таблицы. Для сравнения приведена группировка всей таблицы связей.
+
+    python -m benchmarks.cook
+'''
+from benchmarks.common import test_database, timeit  # isort:skip
+
+from django.db.models import Count, Q
+from rest_framework.test import APIClient
+
+from foodgram.models import Ingredients, RecipeIngredients, Recipes
+from users.models import User
+
+ROWS = (250_000, 1_000_000)
+PER_RECIPE = 8
+INGREDIENTS = 2_000
+BATCH_SIZE = 5_000
+PANTRY = (1, 7, 42, 300, 1500)
+
+
+def fill(author, ingredients, start, end):
+    for low in range(start, end, BATCH_SIZE):
+        high = min(low + BATCH_SIZE, end)
+        recipes = Recipes.objects.bulk_create(
+            Recipes(
+                author=author, name='Рецепт', text='Текст', cooking_time=1,
+                image='recipes/benchmark.png', ingredients_count=PER_RECIPE
+            ) for _ in range(low, high)
+        )
+        if not recipes[0].pk:
+            recipes = Recipes.objects.order_by('-pk')[:len(recipes)]
+        RecipeIngredients.objects.bulk_create(
+            RecipeIngredients(
+                recipe=recipe, amount=1, ingredient=ingredients[
+                    (recipe.pk * 7919 + step * 104729) % len(ingredients)
+                ]
+            )
+            for recipe in recipes for step in range(PER_RECIPE)
+        )
+
+
+def main():
+    with test_database():
+        author = User.objects.create_user(
+            username='bench', email='bench@example.com', password='bench'
+        )
+        ingredients = Ingredients.objects.bulk_create(
+            Ingredients(name=f'Ингредиент {number}', measuring_unit='г')
+            for number in range(INGREDIENTS)
+        )
+        if not ingredients[0].pk:
+            ingredients = list(Ingredients.objects.order_by('pk'))
+        pantry = [ingredients[number].pk for number in PANTRY]
+        url = '/api/recipes/cook/?' + '&'.join(
+            f'ingredients={pk}' for pk in pantry
+        )
+        client = APIClient()
+        created = 0
+        print(f"{'rows':>10} {'cook, ms':>10} {'full group by, ms':>18}")
+        for rows in ROWS:
+            fill(author, ingredients, created, rows // PER_RECIPE)
+            created = rows // PER_RECIPE
+            cook = timeit(lambda: client.get(url))
+            full = timeit(lambda: list(
+                RecipeIngredients.objects.values('recipe').annotate(
+                    matched=Count('pk', filter=Q(ingredient__in=pantry))
+                ).filter(matched__gt=0).order_by('-matched')[:6]
+            ))
+            print(f'{rows:>10} {cook:>10.2f} {full:>18.2f}')
+
+
+if __name__ == '__main__':
+    main()
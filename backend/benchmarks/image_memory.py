@@ -0,0 +1,82 @@
+'''
+Пиковая память при разборе изображения в base64: прежний
+Base64ImageField из drf_extra_fields против StreamingBase64ImageField.
+
+Каждое поле проверяется в отдельном процессе: ru_maxrss только
+растёт, поэтому прирост пика RSS считается от замера, сделанного
+после чтения строки base64, и до конца разбора. Строка base64
+в обоих случаях уже в памяти — её держит разобранный JSON.
+
+    python -m benchmarks.image_memory
+'''
+import benchmarks.common  # noqa: F401 isort:skip
+
+import base64
+import io
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+from django.test import override_settings
+from drf_extra_fields.fields import Base64ImageField
+from PIL import Image
+
+from api.fields import StreamingBase64ImageField
+
+SIZES = ((1000, 800), (2000, 1500), (3000, 2000))
+FIELDS = {
+    'old': Base64ImageField,
+    'new': StreamingBase64ImageField,
+}
+
+
+def make_payload(size, path):
+    '''PNG из шума почти не сжимается: файл порядка 3 байт на точку'''
+    buffer = io.BytesIO()
+    Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3)).save(
+        buffer, 'PNG'
+    )
+    with open(path, 'w') as file:
+        file.write('data:image/png;base64,')
+        file.write(base64.b64encode(buffer.getvalue()).decode())
+
+
+def measure(field, path):
+    with open(path) as file:
+        data = file.read()
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    with override_settings(IMAGE_MAX_BYTES=1 << 30, IMAGE_MAX_SIDE=10_000):
+        FIELDS[field]().to_internal_value(data)
+    traced = tracemalloc.get_traced_memory()[1]
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print((after - before) / 1024, traced / 1024 / 1024)
+
+
+def main():
+    print(f"{'image':>11} {'base64, MB':>11} "
+          f"{'field':>5} {'RSS peak +MB':>13} {'traced MB':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'payload.txt')
+        for size in SIZES:
+            make_payload(size, path)
+            megabytes = os.path.getsize(path) / 1024 / 1024
+            for field in FIELDS:
+                output = subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.image_memory',
+                     field, path],
+                    check=True, capture_output=True, text=True
+                ).stdout
+                rss, traced = map(float, output.split())
+                print(f"{'x'.join(map(str, size)):>11} {megabytes:>11.1f} "
+                      f'{field:>5} {rss:>13.1f} {traced:>10.1f}')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3:
+        measure(*sys.argv[1:])
+    else:
+        main()
@@ -0,0 +1,156 @@
+'''
+Нагрузочный тест /api/recipes/: запросы в секунду и задержки.
+
+С --compare сервер запускается дважды — с DB_CONN_MAX_AGE=0, когда
+каждый запрос открывает новое соединение с PostgreSQL, и с постоянными
+соединениями, — и печатается разница. Нужна доступная база из .env
+(DEBUG пустой) и установленный gunicorn:
+
+    python -m benchmarks.load_test --compare
+    python -m benchmarks.load_test --url http://localhost:8000/api/recipes/
+
+Клиент — потоки со своим keep-alive соединением, без зависимостей.
+'''
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PATH = '/api/recipes/'
+PORT = 8765
+SERVER = (
+    'gunicorn', 'backend.wsgi:application', '-c', 'gunicorn.conf.py',
+    '--bind', f'127.0.0.1:{PORT}',
+)
+MODES = (
+    ('new connection per request', {'DB_CONN_MAX_AGE': '0'}),
+    ('persistent connections', {'DB_CONN_MAX_AGE': '60'}),
+)
+HEADER = (
+    f"{'':>28} {'req/s':>8} {'p50, ms':>8} {'p95, ms':>8} {'p99, ms':>8} "
+    f"{'errors':>7}"
+)
+
+
+def worker(host, port, path, headers, deadline, latencies, errors):
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            errors.append(None)
+            connection.close()
+            connection = http.client.HTTPConnection(host, port, timeout=10)
+            continue
+        if response.status != 200:
+            errors.append(response.status)
+        latencies.append(time.perf_counter() - started)
+    connection.close()
+
+
+def load(url, concurrency, duration, headers=None):
+    '''Запросов в секунду, p50, p95 и p99 в миллисекундах, число ошибок'''
+    parts = urlsplit(url)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=worker, args=(
+            parts.hostname, parts.port or 80, path, headers or {},
+            deadline, latencies, errors
+        )) for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    if not latencies:
+        return 0, 0, 0, 0, len(errors)
+    return (
+        len(latencies) / duration,
+        *(
+            latencies[int(len(latencies) * share)] * 1000
+            for share in (0.5, 0.95, 0.99)
+        ),
+        len(errors),
+    )
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'сервер не открыл порт {port} за {timeout} с')
+
+
+@contextmanager
+def running(command, env):
+    '''Сервер из command с переменными env на время блока'''
+    server = subprocess.Popen(
+        command, cwd=BACKEND_DIR, env={**os.environ, **env},
+        stdout=subprocess.DEVNULL
+    )
+    try:
+        wait_for_port(PORT)
+        yield
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def serve_and_load(command, env, args):
+    with running(command, env):
+        url = f'http://127.0.0.1:{PORT}{PATH}'
+        load(url, args.concurrency, 1)
+        return load(url, args.concurrency, args.duration)
+
+
+def report(name, result):
+    rps, p50, p95, p99, errors = result
+    print(
+        f'{name:>28} {rps:>8.1f} {p50:>8.2f} {p95:>8.2f} {p99:>8.2f} '
+        f'{errors:>7}'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--url', default=f'http://localhost:8000{PATH}')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument(
+        '--server', default=' '.join(SERVER),
+        help='команда запуска сервера для --compare'
+    )
+    args = parser.parse_args()
+    print(HEADER)
+    if not args.compare:
+        report(args.url, load(args.url, args.concurrency, args.duration))
+        return
+    results = []
+    for name, env in MODES:
+        results.append(serve_and_load(args.server.split(), env, args))
+        report(name, results[-1])
+    before, after = results[0][0], results[-1][0]
+    if before:
+        print(f'requests/sec: {after / before - 1:+.0%}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
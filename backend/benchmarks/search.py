@@ -0,0 +1,69 @@
+'''
+Поиск рецептов по слову на 10k-100k рецептов.
+
+Индекс (FTS5 в SQLite, GIN в PostgreSQL) находит все рецепты
+с редким словом за время, которое почти не растёт с числом рецептов.
+Для сравнения приведён подсчёт тех же рецептов перебором
+search_document через icontains и время страницы API.
+
+    python -m benchmarks.search
+'''
+from benchmarks.common import test_database, timeit  # isort:skip
+
+from rest_framework.test import APIClient
+
+from foodgram import search
+from foodgram.models import Recipes
+from users.models import User
+
+SIZES = (10_000, 30_000, 100_000)
+BATCH_SIZE = 5_000
+WORDS = ('капуста', 'свёкла', 'морковь', 'картофель', 'лук', 'чеснок')
+RARE = 'шафран'
+URL = f'/api/recipes/?search={RARE}&limit=6'
+
+
+def fill(author, start, end):
+    for low in range(start, end, BATCH_SIZE):
+        high = min(low + BATCH_SIZE, end)
+        recipes = Recipes.objects.bulk_create(
+            Recipes(
+                author=author, name='Рецепт', text='Текст', cooking_time=1,
+                image='recipes/benchmark.png',
+                search_document=search.document('Рецепт', 'Текст', (
+                    RARE if number % 1000 == 0
+                    else WORDS[number % len(WORDS)],
+                ))
+            ) for number in range(low, high)
+        )
+        if not recipes[0].pk:
+            recipes = Recipes.objects.order_by('-pk')[:len(recipes)]
+        search.index(recipes)
+
+
+def main():
+    with test_database():
+        author = User.objects.create_user(
+            username='bench', email='bench@example.com', password='bench'
+        )
+        client = APIClient()
+        created = 0
+        print(
+            f"{'recipes':>10} {'api, ms':>10} {'index, ms':>10} "
+            f"{'icontains, ms':>14}"
+        )
+        for size in SIZES:
+            fill(author, created, size)
+            created = size
+            api = timeit(lambda: client.get(URL + '&cursor='))
+            indexed = timeit(
+                lambda: search.search(Recipes.objects.all(), RARE).count()
+            )
+            scanned = timeit(lambda: Recipes.objects.filter(
+                search_document__icontains=RARE
+            ).count())
+            print(f'{size:>10} {api:>10.2f} {indexed:>10.2f} {scanned:>14.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+'''
+Фильтрация ленты рецептов по нескольким тэгам на 10k-100k рецептов
+в обоих режимах пагинации.
+
+Время первой страницы в курсорном режиме (?cursor=) не должно расти
+вместе с числом рецептов: EXISTS по индексу (recipe, tag) проверяет
+только рецепты, просмотренные до заполнения страницы. Режим
+page/limit, которым фронтенд пользуется по умолчанию, по-прежнему
+растёт линейно: COUNT(*) для поля count проходит весь отбор.
+В последней строке — во сколько раз выросло время каждого режима.
+
+    python -m benchmarks.tag_filter
+'''
+from benchmarks.common import test_database, timeit  # isort:skip
+
+from rest_framework.test import APIClient
+
+from foodgram.models import Recipes, RecipeTags, Tags
+from users.models import User
+
+SIZES = (10_000, 30_000, 100_000)
+BATCH_SIZE = 5_000
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#39FF14', 'dinner'),
+    ('Ужин', '#8775D2', 'supper'),
+)
+URL = '/api/recipes/?tags=breakfast&tags=supper&limit=6'
+
+
+def fill(author, tags, start, end):
+    for low in range(start, end, BATCH_SIZE):
+        high = min(low + BATCH_SIZE, end)
+        recipes = Recipes.objects.bulk_create(
+            Recipes(
+                author=author, name='Рецепт', text='Текст', cooking_time=1,
+                image='recipes/benchmark.png'
+            ) for _ in range(low, high)
+        )
+        if not recipes[0].pk:
+            recipes = Recipes.objects.order_by('-pk')[:len(recipes)]
+        RecipeTags.objects.bulk_create(
+            RecipeTags(recipe=recipe, tag=tags[recipe.pk % len(tags)])
+            for recipe in recipes
+        )
+
+
+def main():
+    with test_database():
+        author = User.objects.create_user(
+            username='bench', email='bench@example.com', password='bench'
+        )
+        tags = [
+            Tags.objects.create(name=name, color=color, slug=slug)
+            for name, color, slug in TAGS
+        ]
+        client = APIClient()
+        created = 0
+        times = []
+        print(f"{'recipes':>10} {'cursor, ms':>12} {'page, ms':>12}")
+        for size in SIZES:
+            fill(author, tags, created, size)
+            created = size
+            cursor = timeit(lambda: client.get(URL + '&cursor='))
+            page = timeit(lambda: client.get(URL))
+            times.append((cursor, page))
+            print(f'{size:>10} {cursor:>12.2f} {page:>12.2f}')
+        (cursor, page), (last_cursor, last_page) = times[0], times[-1]
+        print(
+            f"{'growth':>10} {last_cursor / cursor:>11.1f}x "
+            f'{last_page / page:>11.1f}x'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from foodgram import counters, search
 from foodgram.models import (Ingredients, RecipeIngredients, Recipes,
                              RecipeTags, ShopLists, Subscriptions, Tags)
 
@@ -31,12 +32,17 @@ class AdminIngredients(admin.ModelAdmin):
 @admin.register(Recipes)
 class AdminRecipes(admin.ModelAdmin):
     inlines = [RecipeIngredientsInline, RecipeTagsInline]
-    list_display = ('author', 'name')
+    list_display = ('author', 'name', 'favorites_count')
     list_filter = ('tags__name',)
     search_fields = ('^author', '^name')
     raw_id_fields = ('author',)
     exclude = ('ingredients',)
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        counters.count_ingredients([form.instance.pk])
+        search.refresh([form.instance.pk])
+
 
 @admin.register(Tags)
 class AdminTags(admin.ModelAdmin):
@@ -3,3 +3,10 @@ from django.apps import AppConfig
 
 class FoodgramConfig(AppConfig):
     name = 'foodgram'
+
+    def ready(self):
+        import foodgram.counters  # noqa: F401
+        import foodgram.images  # noqa: F401
+        import foodgram.reference  # noqa: F401
+        import foodgram.search  # noqa: F401
+        import foodgram.totals  # noqa: F401
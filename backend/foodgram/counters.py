@@ -0,0 +1,113 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from foodgram import reference
+from foodgram.models import (Favorites, RecipeIngredients, Recipes,
+                             Subscriptions, User)
+
+COUNTERS = (
+    (Recipes, 'favorites_count', Favorites, 'recipe'),
+    (Recipes, 'ingredients_count', RecipeIngredients, 'recipe'),
+    (User, 'recipes_count', Recipes, 'author'),
+    (User, 'subscribers_count', Subscriptions, 'author'),
+)
+
+
+def change(queryset, field, delta, **values):
+    '''Атомарно сдвигает счётчик: UPDATE ... SET field = field + delta'''
+    if delta:
+        queryset.update(**{field: Greatest(F(field) + delta, 0)}, **values)
+
+
+def count_favorites(recipe_ids, delta):
+    '''
+    Меняет версии избранного этих рецептов, а не общую версию рецептов:
+    счётчик входит только в ответ по одному рецепту, и добавление
+    в избранное не сбрасывает ETag списка у всех. Дата изменения
+    сдвигается тем же UPDATE: от неё считается Last-Modified рецепта.
+    '''
+    if not delta:
+        return
+    change(
+        Recipes.objects.filter(pk__in=recipe_ids), 'favorites_count', delta,
+        updated_at=timezone.now()
+    )
+    reference.bump_favorites(recipe_ids)
+
+
+def count_subscribers(author_ids, delta):
+    change(User.objects.filter(pk__in=author_ids), 'subscribers_count', delta)
+
+
+def count_ingredients(recipe_ids):
+    '''Для правок в админке, API пишет счётчик вместе с рецептом'''
+    Recipes.objects.filter(pk__in=recipe_ids).update(
+        ingredients_count=counted(RecipeIngredients, 'recipe')
+    )
+
+
+def counted(model, field):
+    '''Подзапрос: сколько строк model ссылается на объект через field'''
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def recount():
+    for model, field, related, related_field in COUNTERS:
+        model.objects.update(**{field: counted(related, related_field)})
+
+
+def verify():
+    '''Счётчики, расходящиеся с таблицами: (модель, поле, pk)'''
+    mismatches = []
+    for model, field, related, related_field in COUNTERS:
+        mismatches += [
+            (model._meta.label, field, pk)
+            for pk in model.objects.annotate(
+                actual=counted(related, related_field)
+            ).exclude(**{field: F('actual')}).values_list('pk', flat=True)
+        ]
+    return mismatches
+
+
+@receiver(post_save, sender=Recipes)
+def count_created_recipe(instance, created, raw=False, **kwargs):
+    if created and not raw:
+        change(User.objects.filter(pk=instance.author_id), 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipes)
+def count_deleted_recipe(instance, **kwargs):
+    change(User.objects.filter(pk=instance.author_id), 'recipes_count', -1)
+
+
+RELATION_COUNTERS = {
+    Favorites: (count_favorites, 'recipe_id'),
+    Subscriptions: (count_subscribers, 'author_id'),
+}
+
+
+@receiver(post_save, sender=Favorites)
+@receiver(post_save, sender=Subscriptions)
+def count_created_relation(sender, instance, created, raw=False, **kwargs):
+    '''
+    Связи, созданные в обход API (админка, shell): API вставляет их
+    без сигналов и сдвигает счётчики само
+    '''
+    if created and not raw:
+        counter, field = RELATION_COUNTERS[sender]
+        counter([getattr(instance, field)], 1)
+
+
+@receiver(post_delete, sender=Favorites)
+@receiver(post_delete, sender=Subscriptions)
+def count_deleted_relation(sender, instance, **kwargs):
+    '''Каскадные удаления, например вместе с пользователем'''
+    counter, field = RELATION_COUNTERS[sender]
+    counter([getattr(instance, field)], -1)
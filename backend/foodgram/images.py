@@ -0,0 +1,124 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from foodgram import reference
+from foodgram.models import Recipes
+
+WEBP_QUALITY = 80
+
+logger = logging.getLogger(__name__)
+
+
+def encode_webp(image):
+    buffer = io.BytesIO()
+    image.save(buffer, 'WEBP', quality=WEBP_QUALITY)
+    return buffer.getvalue()
+
+
+def render_variants(file):
+    '''Байты миниатюры и полноразмерной копии в WebP'''
+    with Image.open(file) as image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        full = encode_webp(image)
+        image.thumbnail(settings.THUMBNAIL_SIZE)
+        return encode_webp(image), full
+
+
+def process(recipe_id):
+    '''
+    Создаёт варианты изображения рецепта. Если пока шла обработка
+    рецепту загрузили другое изображение, файлы удаляются, а варианты
+    нового сделает его собственная задача.
+    '''
+    recipe = Recipes.objects.filter(pk=recipe_id).only(
+        'image', 'thumbnail', 'image_webp'
+    ).first()
+    if recipe is None or not recipe.image:
+        return False
+    source = recipe.image.name
+    try:
+        with recipe.image.open('rb') as file:
+            thumbnail, full = render_variants(file)
+    except Exception:
+        # Битый или слишком большой файл не станет лучше при повторе:
+        # рецепт отмечается, и process_images его больше не берёт
+        Recipes.objects.filter(pk=recipe_id, image=source).update(
+            image_failed=True
+        )
+        raise
+    name = f'{os.path.splitext(os.path.basename(source))[0]}.webp'
+    # Файлы блокируются до записи ссылок на них: иначе удаление
+    # другого рецепта с теми же вариантами успело бы их стереть
+    with transaction.atomic():
+        recipe.thumbnail.save(name, ContentFile(thumbnail), save=False)
+        recipe.image_webp.save(name, ContentFile(full), save=False)
+        updated = Recipes.objects.filter(pk=recipe_id, image=source).update(
+            thumbnail=recipe.thumbnail.name,
+            image_webp=recipe.image_webp.name, image_failed=False,
+            updated_at=timezone.now()
+        )
+    if not updated:
+        delete_files(recipe.thumbnail.name, recipe.image_webp.name)
+        return False
+    reference.recipes.bump()
+    return True
+
+
+def delete_files(*names):
+    storage = Recipes._meta.get_field('image').storage
+    for name in names:
+        if name:
+            storage.delete(name)
+
+
+@receiver(post_delete, sender=Recipes)
+def delete_recipe_files(instance, **kwargs):
+    '''
+    Файлы удалённого рецепта, в том числе каскадом вместе с автором
+    или пачкой из админки, удаляются после коммита, если на них
+    больше не ссылается ни один рецепт
+    '''
+    names = (
+        instance.image.name, instance.thumbnail.name,
+        instance.image_webp.name
+    )
+    transaction.on_commit(lambda: delete_files(*names))
+
+
+def run(recipe_id):
+    try:
+        process(recipe_id)
+    except Exception:
+        logger.exception(
+            'не удалось обработать изображение рецепта %s', recipe_id
+        )
+    finally:
+        connection.close()
+
+
+@lru_cache(maxsize=None)
+def get_executor():
+    return ThreadPoolExecutor(
+        max_workers=settings.IMAGE_WORKERS, thread_name_prefix='images'
+    )
+
+
+def schedule(recipe_id):
+    '''
+    Вызывается после коммита. В режиме queue ничего не делает:
+    рецепты без миниатюр забирает команда process_images.
+    '''
+    if settings.IMAGE_PROCESSING == 'thread':
+        get_executor().submit(run, recipe_id)
@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from foodgram import popularity
+
+
+class Command(BaseCommand):
+    help = 'recomputes time-decayed recipe popularity (run periodically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--half-life', type=float,
+            default=popularity.HALF_LIFE / timedelta(days=1),
+            help='days for an added favourite or purchase to lose half weight'
+        )
+
+    def handle(self, *args, **options):
+        scored = popularity.compute(
+            half_life=timedelta(days=options['half_life'])
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'популярность пересчитана: {scored} рецептов с активностью'
+        ))
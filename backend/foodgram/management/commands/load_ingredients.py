@@ -1,35 +1,173 @@
 import csv
+import json
+import time
 
 from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
 
+from foodgram import reference
 from foodgram.models import Ingredients
 
-CSV_PATH = '../backend/'
+DEFAULT_PATH = 'ingredients.csv'
+BATCH_SIZE = 1000
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for row in csv.DictReader(file):
+        yield row['name'], row['measuring_unit']
+
+
+def read_json(file):
+    '''Читает массив объектов из файла по частям, не загружая его целиком'''
+    decoder = json.JSONDecoder()
+    buffer = file.read(JSON_CHUNK_SIZE).lstrip()
+    if not buffer.startswith('['):
+        raise ValueError('ожидается JSON-массив ингредиентов')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            row, end = decoder.raw_decode(buffer)
+        except ValueError:
+            chunk = file.read(JSON_CHUNK_SIZE)
+            if not chunk:
+                raise
+            buffer += chunk
+            continue
+        buffer = buffer[end:]
+        yield row['name'], row.get('measuring_unit', row.get(
+            'measurement_unit'
+        ))
+
+
+class Echo:
+    '''Псевдофайл для csv.writer, возвращающий записанную строку'''
+
+    def write(self, value):
+        return value
+
+
+class CSVStream:
+    '''
+    Файл для COPY FROM STDIN, строки CSV которого пишутся по мере
+    чтения: файл целиком в памяти не собирается
+    '''
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.writer = csv.writer(Echo())
+        self.buffer = ''
+        self.count = 0
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            row = next(self.rows, None)
+            if row is None:
+                break
+            self.buffer += self.writer.writerow(row)
+            self.count += 1
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+}
 
 
 class Command(BaseCommand):
-    help = 'loads data from ingredients .csv file'
+    help = 'loads data from ingredients .csv or .json file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=DEFAULT_PATH,
+            help='path to ingredients.csv or ingredients.json'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=BATCH_SIZE,
+            help='rows per INSERT statement'
+        )
+        parser.add_argument(
+            '--no-copy', action='store_true',
+            help='use bulk_create even on PostgreSQL'
+        )
+
+    def new_rows(self, rows):
+        '''Отбрасывает пары (название, единица), уже имеющиеся в базе'''
+        seen = set(Ingredients.objects.values_list('name', 'measuring_unit'))
+        self.read = 0
+        for row in rows:
+            self.read += 1
+            if row not in seen:
+                seen.add(row)
+                yield row
+
+    def bulk_insert(self, rows, batch_size):
+        batch = []
+        inserted = 0
+        for name, measuring_unit in rows:
+            batch.append(
+                Ingredients(name=name, measuring_unit=measuring_unit)
+            )
+            if len(batch) >= batch_size:
+                Ingredients.objects.bulk_create(batch)
+                inserted += len(batch)
+                batch = []
+        Ingredients.objects.bulk_create(batch)
+        return inserted + len(batch)
+
+    def copy_insert(self, rows):
+        '''
+        COPY из потока строк. copy_expert не входит в обёртку курсора
+        Django, поэтому ошибки psycopg2 переводятся в DatabaseError явно
+        '''
+        stream = CSVStream(iter(rows))
+        with connection.cursor() as cursor:
+            with connection.wrap_database_errors:
+                cursor.copy_expert(
+                    f'COPY {Ingredients._meta.db_table} '
+                    '(name, measuring_unit) FROM STDIN WITH (FORMAT csv)',
+                    stream
+                )
+        return stream.count
 
-    def read_file(self):
+    def load(self, file, reader, options):
+        rows = self.new_rows(READERS[reader](file))
+        with transaction.atomic():
+            if connection.vendor == 'postgresql' and not options['no_copy']:
+                return self.copy_insert(rows)
+            return self.bulk_insert(rows, options['batch_size'])
+
+    def handle(self, *args, **options):
+        path = options['path']
+        reader = path.rsplit('.', 1)[-1].lower()
+        if reader not in READERS:
+            raise CommandError(f'неизвестный формат файла: {path}')
+        started = time.monotonic()
         try:
-            with open('ingredients.csv', encoding='utf-8') as file:
-                reader = csv.DictReader(file)
-                for row in reader:
-                    try:
-                        Ingredients.objects.get_or_create(**row)
-                    except Exception as e:
-                        raise CommandError(
-                            'Ошибка при импорте данных из ingredients.csv '
-                            f'в модель Ingedients: {e}'
-                        )
+            with open(path, encoding='utf-8') as file:
+                inserted = self.load(file, reader, options)
         except IOError:
             self.stdout.write(self.style.ERROR(
-                'не может прочитать ingredients.csv'
-            ))
-        else:
-            self.stdout.write(self.style.SUCCESS(
-                'ingredients.csv прочитан успешно'
+                f'не может прочитать {path}'
             ))
-
-    def handle(self, *args, **options):
-        return self.read_file()
+            return
+        except (DatabaseError, KeyError, ValueError) as e:
+            raise CommandError(
+                f'Ошибка при импорте данных из {path} '
+                f'в модель Ingedients: {e}'
+            )
+        if inserted:
+            reference.ingredients.bump()
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(self.style.SUCCESS(
+            f'{path} прочитан успешно: {self.read} строк, '
+            f'добавлено {inserted} за {elapsed:.2f} с '
+            f'({self.read / elapsed:.0f} строк/с)'
+        ))
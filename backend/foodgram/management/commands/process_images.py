@@ -0,0 +1,54 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from foodgram import images
+from foodgram.models import Recipes
+
+
+class Command(BaseCommand):
+    help = 'creates thumbnails and WebP copies of recipe images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='keep polling for new images (IMAGE_PROCESSING=queue)'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='seconds between polls in --loop mode'
+        )
+        parser.add_argument(
+            '--all', action='store_true',
+            help=(
+                'recreate variants of every recipe image, '
+                'including ones that failed before'
+            )
+        )
+
+    def pending(self, everything):
+        '''Рецепты без вариантов, кроме тех, что уже не удалось обработать'''
+        recipes = Recipes.objects.exclude(image='')
+        if not everything:
+            recipes = recipes.filter(thumbnail='', image_failed=False)
+        return list(recipes.values_list('pk', flat=True))
+
+    def process(self, everything=False):
+        processed = 0
+        for pk in self.pending(everything):
+            try:
+                processed += images.process(pk)
+            except Exception as e:
+                self.stderr.write(f'рецепт {pk}: {e!r}')
+        return processed
+
+    def handle(self, *args, **options):
+        processed = self.process(options['all'])
+        self.stdout.write(self.style.SUCCESS(
+            f'обработано изображений: {processed}'
+        ))
+        while options['loop']:
+            time.sleep(options['interval'])
+            processed = self.process()
+            if processed:
+                self.stdout.write(f'обработано изображений: {processed}')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from foodgram import search
+from foodgram.models import Recipes
+
+
+class Command(BaseCommand):
+    help = 'rebuilds recipe search documents and the search index'
+
+    def handle(self, *args, **options):
+        recipe_ids = list(Recipes.objects.values_list('pk', flat=True))
+        search.refresh(recipe_ids)
+        self.stdout.write(self.style.SUCCESS(
+            f'поисковый индекс пересобран: {len(recipe_ids)} рецептов'
+        ))
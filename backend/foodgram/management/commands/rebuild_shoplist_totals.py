@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram.models import ShopListTotals
+
+
+class Command(BaseCommand):
+    help = 'rebuilds and verifies materialized shopping cart totals'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='only verify totals without rebuilding them'
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            ShopListTotals.objects.rebuild()
+            self.stdout.write('суммы корзин пересчитаны')
+        mismatches = ShopListTotals.objects.verify()
+        if mismatches:
+            raise CommandError(
+                f'расхождения в суммах корзин: {len(mismatches)} '
+                f'(пользователь, ингредиент): {sorted(mismatches)[:10]}'
+            )
+        self.stdout.write(self.style.SUCCESS('суммы корзин совпадают'))
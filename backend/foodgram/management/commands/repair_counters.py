@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram import counters
+
+
+class Command(BaseCommand):
+    help = 'recounts favourites, recipes and subscribers counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='only verify counters without repairing them'
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            counters.recount()
+            self.stdout.write('счётчики пересчитаны')
+        mismatches = counters.verify()
+        if mismatches:
+            raise CommandError(
+                f'расхождения в счётчиках: {len(mismatches)} '
+                f'(модель, поле, pk): {sorted(mismatches)[:10]}'
+            )
+        self.stdout.write(self.style.SUCCESS('счётчики совпадают'))
@@ -0,0 +1,54 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def fill_totals(apps, schema_editor):
+    ShopLists = apps.get_model('foodgram', 'ShopLists')
+    ShopListTotals = apps.get_model('foodgram', 'ShopListTotals')
+    rows = ShopLists.objects.filter(
+        recipe__recipeingredients__isnull=False
+    ).values(
+        'user', 'recipe__recipeingredients__ingredient'
+    ).annotate(
+        amount=Sum('recipe__recipeingredients__amount')
+    ).order_by()
+    ShopListTotals.objects.bulk_create(
+        ShopListTotals(
+            user_id=row['user'],
+            ingredient_id=row['recipe__recipeingredients__ingredient'],
+            amount=row['amount']
+        ) for row in rows
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('foodgram', '0005_auto_20221209_0119'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShopListTotals',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(verbose_name='количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='foodgram.Ingredients', verbose_name='ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shoplist_totals', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Сумма ингридиента в корзине',
+                'verbose_name_plural': 'Суммы ингридиентов в корзине',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoplisttotals',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shoplist_total'),
+        ),
+        migrations.RunPython(fill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+INDEXES = (
+    'CREATE INDEX IF NOT EXISTS foodgram_ingredients_name_prefix '
+    'ON foodgram_ingredients (UPPER(name::text) text_pattern_ops)',
+    'CREATE INDEX IF NOT EXISTS foodgram_ingredients_name_trgm '
+    'ON foodgram_ingredients USING gin (UPPER(name::text) gin_trgm_ops)',
+)
+
+
+def create_indexes(apps, schema_editor):
+    '''
+    Индексы под istartswith/icontains, которые Django строит как
+    UPPER("name"::text) LIKE UPPER(%s). Только для PostgreSQL.
+    '''
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for sql in INDEXES:
+        schema_editor.execute(sql)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'DROP INDEX IF EXISTS foodgram_ingredients_name_prefix, '
+        'foodgram_ingredients_name_trgm'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0006_shoplisttotals'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0007_ingredients_autocomplete_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0008_recipes_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipes',
+            index=models.Index(fields=['author', 'id'], name='recipes_author_id_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0009_recipes_author_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipetags',
+            index=models.Index(fields=['recipe', 'tag'], name='recipetags_recipe_tag_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0010_recipetags_recipe_tag_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='favorites',
+            index=models.Index(fields=['user', 'recipe'], name='favorites_user_recipe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoplists',
+            index=models.Index(fields=['user', 'recipe'], name='shoplists_user_recipe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subscriptions',
+            index=models.Index(fields=['author', 'subscriber'], name='subscriptions_author_idx'),
+        ),
+    ]
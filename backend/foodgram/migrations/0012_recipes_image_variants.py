@@ -0,0 +1,23 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0011_relation_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='image_webp',
+            field=models.ImageField(blank=True, editable=False, upload_to='recipes/webp/', verbose_name='Изображение в WebP'),
+        ),
+        migrations.AddField(
+            model_name='recipes',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='recipes/thumbnails/', verbose_name='Миниатюра'),
+        ),
+    ]
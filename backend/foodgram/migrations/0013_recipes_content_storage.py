@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:47
+
+from django.db import migrations, models
+
+import foodgram.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0012_recipes_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipes',
+            name='image',
+            field=models.ImageField(storage=foodgram.storage.ContentAddressedStorage(), upload_to='recipes/', verbose_name='Изображение рецепта'),
+        ),
+        migrations.AlterField(
+            model_name='recipes',
+            name='image_webp',
+            field=models.ImageField(blank=True, editable=False, storage=foodgram.storage.ContentAddressedStorage(), upload_to='recipes/webp/', verbose_name='Изображение в WebP'),
+        ),
+        migrations.AlterField(
+            model_name='recipes',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, storage=foodgram.storage.ContentAddressedStorage(), upload_to='recipes/thumbnails/', verbose_name='Миниатюра'),
+        ),
+    ]
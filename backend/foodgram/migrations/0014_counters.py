@@ -0,0 +1,42 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:48
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def counted(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Favorites = apps.get_model('foodgram', 'Favorites')
+    Recipes = apps.get_model('foodgram', 'Recipes')
+    Subscriptions = apps.get_model('foodgram', 'Subscriptions')
+    User = apps.get_model('users', 'User')
+    Recipes.objects.update(favorites_count=counted(Favorites, 'recipe'))
+    User.objects.update(
+        recipes_count=counted(Recipes, 'author'),
+        subscribers_count=counted(Subscriptions, 'author')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0013_recipes_content_storage'),
+        ('users', '0002_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
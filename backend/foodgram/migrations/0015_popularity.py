@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:50
+
+import datetime
+
+from django.db import migrations, models
+from django.utils.timezone import utc
+
+# Старые строки получают дату в прошлом, а не время миграции: иначе
+# compute_popularity примет всё накопленное избранное за свежее.
+ADDED_BEFORE = datetime.datetime(2000, 1, 1, tzinfo=utc)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0014_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorites',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=ADDED_BEFORE, verbose_name='Добавлен'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipes',
+            name='popularity',
+            field=models.FloatField(default=0, editable=False, verbose_name='Популярность'),
+        ),
+        migrations.AddField(
+            model_name='shoplists',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, db_index=True, default=ADDED_BEFORE, verbose_name='Добавлен'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='recipes',
+            index=models.Index(fields=['popularity', 'id'], name='recipes_popularity_idx'),
+        ),
+    ]
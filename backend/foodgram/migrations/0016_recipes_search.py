@@ -0,0 +1,74 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:55
+
+from django.db import migrations, models
+
+SQLITE_TABLE = 'foodgram_recipes_search'
+
+
+def fill_documents(apps, schema_editor):
+    Recipes = apps.get_model('foodgram', 'Recipes')
+    RecipeIngredients = apps.get_model('foodgram', 'RecipeIngredients')
+    names = {}
+    for recipe, name in RecipeIngredients.objects.values_list(
+        'recipe', 'ingredient__name'
+    ).order_by('pk').iterator():
+        names.setdefault(recipe, []).append(name)
+    recipes = []
+    for recipe in Recipes.objects.only('name', 'text').iterator():
+        recipe.search_document = '\n'.join((
+            recipe.name, recipe.text, ' '.join(names.get(recipe.pk, []))
+        ))
+        recipes.append(recipe)
+    Recipes.objects.bulk_update(
+        recipes, ['search_document'], batch_size=1000
+    )
+
+
+def create_index(apps, schema_editor):
+    '''
+    PostgreSQL: GIN-индекс по to_tsvector документа.
+    SQLite: таблица FTS5 с rowid рецепта, её ведёт foodgram.search.
+    '''
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS foodgram_recipes_search_idx '
+            'ON foodgram_recipes USING gin '
+            "(to_tsvector('russian', search_document))"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {SQLITE_TABLE} '
+            'USING fts5(search_document)'
+        )
+        schema_editor.execute(
+            f'INSERT INTO {SQLITE_TABLE} (rowid, search_document) '
+            'SELECT id, search_document FROM foodgram_recipes'
+        )
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'DROP INDEX IF EXISTS foodgram_recipes_search_idx'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SQLITE_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0015_popularity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Документ для поиска'),
+        ),
+        migrations.RunPython(fill_documents, migrations.RunPython.noop),
+        migrations.RunPython(create_index, drop_index),
+    ]
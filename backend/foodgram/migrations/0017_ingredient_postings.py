@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:59
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_ingredients_count(apps, schema_editor):
+    Recipes = apps.get_model('foodgram', 'Recipes')
+    RecipeIngredients = apps.get_model('foodgram', 'RecipeIngredients')
+    Recipes.objects.update(ingredients_count=Coalesce(Subquery(
+        RecipeIngredients.objects.filter(recipe=OuterRef('pk')).order_by()
+        .values('recipe').annotate(total=Count('pk')).values('total')
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0016_recipes_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='ingredients_count',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Число ингредиентов'),
+        ),
+        migrations.AddIndex(
+            model_name='recipeingredients',
+            index=models.Index(fields=['ingredient', 'recipe'], name='recipeingr_ingr_recipe_idx'),
+        ),
+        migrations.RunPython(
+            fill_ingredients_count, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:29
+
+from django.db import migrations, models
+
+import foodgram.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0017_ingredient_postings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileLocks',
+            fields=[
+                ('name', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Имя файла')),
+            ],
+            options={
+                'verbose_name': 'Блокировка файла',
+                'verbose_name_plural': 'Блокировки файлов',
+            },
+        ),
+        migrations.AlterField(
+            model_name='recipes',
+            name='image',
+            field=models.ImageField(db_index=True, storage=foodgram.storage.ContentAddressedStorage(), upload_to='recipes/', verbose_name='Изображение рецепта'),
+        ),
+        migrations.AlterField(
+            model_name='recipes',
+            name='image_webp',
+            field=models.ImageField(blank=True, db_index=True, editable=False, storage=foodgram.storage.ContentAddressedStorage(), upload_to='recipes/webp/', verbose_name='Изображение в WebP'),
+        ),
+        migrations.AlterField(
+            model_name='recipes',
+            name='thumbnail',
+            field=models.ImageField(blank=True, db_index=True, editable=False, storage=foodgram.storage.ContentAddressedStorage(), upload_to='recipes/thumbnails/', verbose_name='Миниатюра'),
+        ),
+    ]
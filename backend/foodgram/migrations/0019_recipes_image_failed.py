@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodgram', '0018_file_locks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='image_failed',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Изображение не обработано'),
+        ),
+    ]
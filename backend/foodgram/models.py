@@ -1,10 +1,16 @@
 from __future__ import annotations
 
+import operator
+from functools import reduce
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import Case, F, Q, Sum, Value, When
+from django.db.models.sql import InsertQuery
 
+from foodgram.storage import content_storage
 from foodgram.validators import bigger_than_zero
 
 User = get_user_model()
@@ -67,7 +73,19 @@ class Recipes(models.Model):
         validators=[RegexValidator(r'^[а-яА-Я- ]+$')]
     )
     image = models.ImageField(
-        'Изображение рецепта', upload_to='recipes/'
+        'Изображение рецепта', upload_to='recipes/', storage=content_storage,
+        db_index=True
+    )
+    thumbnail = models.ImageField(
+        'Миниатюра', upload_to='recipes/thumbnails/', blank=True,
+        editable=False, storage=content_storage, db_index=True
+    )
+    image_webp = models.ImageField(
+        'Изображение в WebP', upload_to='recipes/webp/', blank=True,
+        editable=False, storage=content_storage, db_index=True
+    )
+    image_failed = models.BooleanField(
+        'Изображение не обработано', default=False, editable=False
     )
     text = models.TextField('описание рецепта')
     tags = models.ManyToManyField(
@@ -80,11 +98,32 @@ class Recipes(models.Model):
     cooking_time = models.PositiveSmallIntegerField(
         'Время приготовления', validators=[bigger_than_zero, ]
     )
+    updated_at = models.DateTimeField('Дата изменения', auto_now=True)
+    favorites_count = models.PositiveIntegerField(
+        'В избранном', default=0, editable=False
+    )
+    popularity = models.FloatField(
+        'Популярность', default=0, editable=False
+    )
+    ingredients_count = models.PositiveSmallIntegerField(
+        'Число ингредиентов', default=0, editable=False
+    )
+    search_document = models.TextField(
+        'Документ для поиска', blank=True, default='', editable=False
+    )
 
     class Meta:
         ordering = ('pk',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=('author', 'id'), name='recipes_author_id_idx'
+            ),
+            models.Index(
+                fields=('popularity', 'id'), name='recipes_popularity_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.name
@@ -111,11 +150,48 @@ class RecipeIngredients(models.Model):
                 fields=['recipe', 'ingredient'], name='unique_ingredient'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('ingredient', 'recipe'),
+                name='recipeingr_ingr_recipe_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         return f'{self.recipe} - {self.ingredient}'
 
 
+class RelationQuerySet(models.QuerySet):
+    '''Связи пользователя с объектом, изменяемые одним запросом'''
+
+    def insert_ignore(self, **values):
+        '''
+        INSERT ... ON CONFLICT DO NOTHING (INSERT OR IGNORE в SQLite).
+        В отличие от bulk_create(ignore_conflicts=True) сообщает,
+        была ли строка добавлена: возвращает число новых строк.
+        '''
+        fields = [
+            field for field in self.model._meta.local_concrete_fields
+            if not isinstance(field, models.AutoField)
+        ]
+        query = InsertQuery(self.model, ignore_conflicts=True)
+        query.insert_values(fields, [self.model(**values)])
+        inserted = 0
+        with connections[self.db].cursor() as cursor:
+            for sql, params in query.get_compiler(self.db).as_sql():
+                cursor.execute(sql, params)
+                inserted += cursor.rowcount
+        return inserted
+
+    def raw_delete(self):
+        '''
+        DELETE одним запросом, без выборки строк и сигналов post_delete:
+        счётчики и суммы корзины вызывающий сдвигает сам. Возвращает
+        число удалённых строк.
+        '''
+        return self._raw_delete(self.db)
+
+
 class Favorites(models.Model):
     recipe = models.ForeignKey(
         Recipes, on_delete=models.CASCADE, related_name='+'
@@ -123,6 +199,11 @@ class Favorites(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name='favorites'
     )
+    created = models.DateTimeField(
+        'Добавлен', auto_now_add=True, db_index=True
+    )
+
+    objects = RelationQuerySet.as_manager()
 
     class Meta:
         constraints = [
@@ -130,6 +211,11 @@ class Favorites(models.Model):
                 fields=['recipe', 'user'], name='unique_favorite'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=('user', 'recipe'), name='favorites_user_recipe_idx'
+            ),
+        ]
         verbose_name = 'Избранный рецепт'
         verbose_name_plural = 'Избранные рецепты'
         ordering = ('pk',)
@@ -146,6 +232,8 @@ class Subscriptions(models.Model):
         User, on_delete=models.CASCADE, related_name='subscribed'
     )
 
+    objects = RelationQuerySet.as_manager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -156,6 +244,12 @@ class Subscriptions(models.Model):
                 name='dont_follow_yourself'
             ),
         ]
+        indexes = [
+            models.Index(
+                fields=('author', 'subscriber'),
+                name='subscriptions_author_idx'
+            ),
+        ]
         ordering = ('pk',)
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
@@ -171,6 +265,11 @@ class ShopLists(models.Model):
     user = models.ForeignKey(
         User, related_name='shoplist', on_delete=models.CASCADE,
     )
+    created = models.DateTimeField(
+        'Добавлен', auto_now_add=True, db_index=True
+    )
+
+    objects = RelationQuerySet.as_manager()
 
     class Meta:
         verbose_name_plural = 'Список покупок'
@@ -180,6 +279,11 @@ class ShopLists(models.Model):
                 fields=['recipe', 'user'], name='unique_purchase'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('user', 'recipe'), name='shoplists_user_recipe_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         return f'{self.user} - {self.recipe}'
@@ -201,6 +305,178 @@ class RecipeTags(models.Model):
                 fields=['tag', 'recipe'], name='unique_tag'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=('recipe', 'tag'), name='recipetags_recipe_tag_idx'
+            ),
+        ]
 
     def __str__(self) -> str:
         return f"{self.recipe} - {self.tag}"
+
+
+class ShopListTotalsManager(models.Manager):
+    '''
+    Поддерживает суммы ингредиентов корзины в актуальном состоянии:
+    вместо пересчёта всей корзины применяются разницы по ингредиентам
+    '''
+
+    def apply(self, user_ids, deltas):
+        deltas = {
+            ingredient: delta for ingredient, delta in deltas.items() if delta
+        }
+        if not deltas:
+            return
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+        totals = self.filter(user__in=user_ids)
+        with transaction.atomic():
+            list(User.objects.select_for_update().filter(pk__in=user_ids))
+            exhausted = [
+                Q(ingredient=ingredient, amount__lte=-delta)
+                for ingredient, delta in deltas.items() if delta < 0
+            ]
+            if exhausted:
+                totals.filter(reduce(operator.or_, exhausted)).delete()
+            existing = set(totals.filter(
+                ingredient__in=deltas
+            ).values_list('user', 'ingredient'))
+            if existing:
+                totals.filter(ingredient__in=deltas).update(
+                    amount=F('amount') + Case(*(
+                        When(ingredient=ingredient, then=Value(delta))
+                        for ingredient, delta in deltas.items()
+                    ), output_field=models.IntegerField())
+                )
+            self.bulk_create(
+                self.model(
+                    user_id=user, ingredient_id=ingredient, amount=delta
+                )
+                for user in user_ids
+                for ingredient, delta in deltas.items()
+                if delta > 0 and (user, ingredient) not in existing
+            )
+
+    def recipe_amounts(self, recipe):
+        return dict(RecipeIngredients.objects.filter(
+            recipe=recipe
+        ).values_list('ingredient', 'amount'))
+
+    def recipes_amounts(self, recipes):
+        return dict(RecipeIngredients.objects.filter(
+            recipe__in=recipes
+        ).order_by().values('ingredient').annotate(
+            total=Sum('amount')
+        ).values_list('ingredient', 'total'))
+
+    def add_recipe(self, user, recipe):
+        self.apply([user.pk], self.recipe_amounts(recipe))
+
+    def remove_recipe(self, user, recipe):
+        self.apply([user.pk], {
+            ingredient: -amount
+            for ingredient, amount in self.recipe_amounts(recipe).items()
+        })
+
+    def add_recipes(self, user, recipes):
+        self.apply([user.pk], self.recipes_amounts(recipes))
+
+    def remove_recipes(self, user, recipes):
+        self.apply([user.pk], {
+            ingredient: -amount
+            for ingredient, amount in self.recipes_amounts(recipes).items()
+        })
+
+    def change_recipe(self, recipe, old_amounts, new_amounts):
+        '''Переносит изменение ингредиентов рецепта в корзины с ним'''
+        self.apply(
+            ShopLists.objects.filter(recipe=recipe).values_list(
+                'user', flat=True
+            ), {
+                ingredient: (
+                    new_amounts.get(ingredient, 0)
+                    - old_amounts.get(ingredient, 0)
+                ) for ingredient in {*old_amounts, *new_amounts}
+            }
+        )
+
+    def calculate(self):
+        return ShopLists.objects.filter(
+            recipe__recipeingredients__isnull=False
+        ).values(
+            'user', 'recipe__recipeingredients__ingredient'
+        ).annotate(
+            amount=Sum('recipe__recipeingredients__amount')
+        ).values_list(
+            'user', 'recipe__recipeingredients__ingredient', 'amount'
+        ).order_by()
+
+    def rebuild(self):
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(
+                self.model(
+                    user_id=user, ingredient_id=ingredient, amount=amount
+                ) for user, ingredient, amount in self.calculate().iterator()
+            )
+
+    def verify(self):
+        '''Возвращает пары (пользователь, ингредиент) с неверной суммой'''
+        expected = {
+            (user, ingredient): amount
+            for user, ingredient, amount in self.calculate().iterator()
+        }
+        stored = {
+            (user, ingredient): amount
+            for user, ingredient, amount in self.values_list(
+                'user', 'ingredient', 'amount'
+            ).iterator()
+        }
+        return {
+            key for key in {*expected, *stored}
+            if expected.get(key) != stored.get(key)
+        }
+
+
+class ShopListTotals(models.Model):
+    user = models.ForeignKey(
+        User, related_name='shoplist_totals', on_delete=models.CASCADE,
+    )
+    ingredient = models.ForeignKey(
+        Ingredients, on_delete=models.CASCADE, related_name='+',
+        verbose_name='ингредиент'
+    )
+    amount = models.PositiveIntegerField('количество')
+
+    objects = ShopListTotalsManager()
+
+    class Meta:
+        verbose_name = 'Сумма ингридиента в корзине'
+        verbose_name_plural = 'Суммы ингридиентов в корзине'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'], name='unique_shoplist_total'
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.user} - {self.ingredient}: {self.amount}'
+
+
+class FileLocks(models.Model):
+    '''
+    Строка на каждый файл в ContentAddressedStorage: по её блокировке
+    сохранение файла и удаление файла без ссылок идут по очереди.
+    Удаляется вместе с файлом.
+    '''
+    name = models.CharField('Имя файла', max_length=255, primary_key=True)
+
+    objects = RelationQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Блокировка файла'
+        verbose_name_plural = 'Блокировки файлов'
+
+    def __str__(self) -> str:
+        return self.name
@@ -0,0 +1,46 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from foodgram import reference
+from foodgram.models import Favorites, Recipes, ShopLists
+
+HALF_LIFE = timedelta(days=7)
+WINDOW_HALF_LIVES = 8
+WEIGHTS = (
+    (Favorites, 1.0),
+    (ShopLists, 2.0),
+)
+BATCH_SIZE = 1000
+
+
+def scores(now=None, half_life=HALF_LIFE):
+    '''
+    Сумма весов добавлений рецепта в избранное и корзину, где каждое
+    добавление вдвое теряет вес за half_life. Строки старше
+    WINDOW_HALF_LIVES периодов вносят меньше 1/256 веса и не читаются.
+    '''
+    now = now or timezone.now()
+    result = defaultdict(float)
+    for model, weight in WEIGHTS:
+        rows = model.objects.filter(
+            created__gte=now - half_life * WINDOW_HALF_LIVES
+        ).values_list('recipe', 'created').order_by().iterator()
+        for recipe, created in rows:
+            result[recipe] += weight * 0.5 ** ((now - created) / half_life)
+    return result
+
+
+def compute(now=None, half_life=HALF_LIFE):
+    '''Записывает счёт в Recipes.popularity, возвращает число рецептов'''
+    result = scores(now, half_life)
+    with transaction.atomic():
+        Recipes.objects.exclude(popularity=0).update(popularity=0)
+        Recipes.objects.bulk_update(
+            [Recipes(pk=pk, popularity=score) for pk, score in result.items()],
+            ['popularity'], batch_size=BATCH_SIZE
+        )
+    reference.recipes.bump()
+    return len(result)
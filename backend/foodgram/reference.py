@@ -0,0 +1,160 @@
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from foodgram.models import Ingredients, Recipes, Tags, User
+
+CACHE_ALIAS = 'reference'
+
+
+class Version:
+    '''
+    Счётчик версии в общем кэше. Пропавший из кэша ключ заводится
+    заново от текущего времени, чтобы не совпасть со старыми версиями.
+    '''
+
+    def __init__(self, key, alias=CACHE_ALIAS):
+        self.key = f'{key}:version'
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self):
+        version = self.cache.get(self.key)
+        if version is None:
+            self.cache.add(self.key, time.time_ns())
+            version = self.cache.get(self.key)
+        return version
+
+    def bump(self):
+        '''
+        Версия меняется после коммита текущей транзакции: запрос,
+        пришедший до коммита, не должен закэшировать прежние строки
+        под новой версией
+        '''
+        transaction.on_commit(self.increment)
+
+    def increment(self):
+        try:
+            self.cache.incr(self.key)
+        except ValueError:
+            self.cache.set(self.key, time.time_ns())
+
+
+class ReferenceData:
+    '''
+    Справочник модели, закэшированный целиком под номером версии.
+    Версия лежит в общем кэше и меняется при любом изменении модели,
+    а последний снимок дополнительно хранится в памяти процесса,
+    так что на запрос приходится одно чтение версии из кэша.
+    '''
+
+    def __init__(self, model):
+        self.model = model
+        self.key = model._meta.label_lower
+        self.version = Version(self.key)
+        self.local = (None, None)
+
+    @property
+    def cache(self):
+        return caches[CACHE_ALIAS]
+
+    def bump(self):
+        self.version.bump()
+
+    def all(self):
+        '''Словарь {pk: объект} для текущей версии справочника'''
+        version = self.version.get()
+        local_version, objects = self.local
+        if local_version == version:
+            return objects
+        objects = self.cache.get(f'{self.key}:{version}')
+        if objects is None:
+            objects = {obj.pk: obj for obj in self.model.objects.all()}
+            self.cache.set(f'{self.key}:{version}', objects)
+        self.local = (version, objects)
+        return objects
+
+    def get(self, pk):
+        return self.all().get(pk)
+
+
+def touch_recipes(queryset):
+    '''
+    Сдвигает дату изменения рецептов, ответ по которым построен
+    из изменённой строки: от неё считается Last-Modified
+    '''
+    queryset.update(updated_at=timezone.now())
+
+
+def relations_version(user):
+    '''Версия избранного, корзины и подписок пользователя'''
+    return Version(f'users.user:{user.pk}:relations')
+
+
+def favorites_version(recipe_id):
+    '''Версия числа добавлений рецепта в избранное'''
+    return Version(f'foodgram.recipes:{recipe_id}:favorites')
+
+
+def bump_favorites(recipe_ids):
+    '''
+    Сбрасывает версии избранного рецептов одним delete_many после
+    коммита: Version.get заведёт их заново от текущего времени
+    '''
+    keys = [favorites_version(pk).key for pk in recipe_ids]
+    transaction.on_commit(lambda: caches[CACHE_ALIAS].delete_many(keys))
+
+
+tags = ReferenceData(Tags)
+ingredients = ReferenceData(Ingredients)
+recipes = Version('foodgram.recipes')
+REFERENCES = {Tags: tags, Ingredients: ingredients}
+
+
+@receiver(post_save, sender=Tags)
+@receiver(post_save, sender=Ingredients)
+@receiver(post_delete, sender=Tags)
+@receiver(post_delete, sender=Ingredients)
+def bump_version(sender, **kwargs):
+    REFERENCES[sender].bump()
+
+
+@receiver(post_save, sender=Recipes)
+@receiver(post_delete, sender=Recipes)
+def bump_recipes_version(**kwargs):
+    recipes.bump()
+
+
+@receiver(post_save, sender=User)
+def bump_recipes_version_on_author_change(
+    instance, created=False, update_fields=None, **kwargs
+):
+    '''Данные автора входят в ответ рецептов, кроме даты входа'''
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    recipes.bump()
+    if not created:
+        touch_recipes(Recipes.objects.filter(author=instance))
+
+
+@receiver(post_save, sender=Tags)
+@receiver(pre_delete, sender=Tags)
+def touch_tagged_recipes(instance, created=False, **kwargs):
+    if not created:
+        touch_recipes(Recipes.objects.filter(tags=instance))
+
+
+@receiver(post_save, sender=Ingredients)
+@receiver(pre_delete, sender=Ingredients)
+def touch_recipes_with_ingredient(instance, created=False, **kwargs):
+    if not created:
+        touch_recipes(Recipes.objects.filter(
+            recipeingredients__ingredient=instance
+        ))
@@ -0,0 +1,109 @@
+import re
+
+from django.db import connection
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from foodgram import reference
+from foodgram.models import Ingredients, RecipeIngredients, Recipes
+
+SQLITE_TABLE = 'foodgram_recipes_search'
+CONFIG = 'russian'
+BATCH_SIZE = 1000
+SEARCH_SQL = {
+    'postgresql': (
+        f"to_tsvector('{CONFIG}', foodgram_recipes.search_document) "
+        f"@@ to_tsquery('{CONFIG}', %s)"
+    ),
+    'sqlite': (
+        f'foodgram_recipes.id IN (SELECT rowid FROM {SQLITE_TABLE} '
+        f'WHERE {SQLITE_TABLE} MATCH %s)'
+    ),
+}
+
+
+def document(name, text, ingredient_names):
+    '''Текст, по которому ищется рецепт'''
+    return '\n'.join((name, text, ' '.join(ingredient_names)))
+
+
+def ingredient_names(ingredient_ids):
+    return [reference.ingredients.get(pk).name for pk in ingredient_ids]
+
+
+def index(recipes):
+    '''
+    Переносит search_document в таблицу FTS5. В PostgreSQL
+    GIN-индекс по to_tsvector обновляется вместе со строкой.
+    '''
+    if connection.vendor != 'sqlite' or not recipes:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT OR REPLACE INTO {SQLITE_TABLE} '
+            '(rowid, search_document) VALUES (%s, %s)',
+            [(recipe.pk, recipe.search_document) for recipe in recipes]
+        )
+
+
+def refresh(recipe_ids):
+    '''Пересобирает документы рецептов пачками по BATCH_SIZE'''
+    recipe_ids = list(recipe_ids)
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        batch = recipe_ids[start:start + BATCH_SIZE]
+        names = {}
+        for recipe, name in RecipeIngredients.objects.filter(
+            recipe__in=batch
+        ).values_list('recipe', 'ingredient__name').order_by('pk'):
+            names.setdefault(recipe, []).append(name)
+        recipes = list(Recipes.objects.filter(pk__in=batch).only(
+            'name', 'text'
+        ))
+        for recipe in recipes:
+            recipe.search_document = document(
+                recipe.name, recipe.text, names.get(recipe.pk, [])
+            )
+        Recipes.objects.bulk_update(recipes, ['search_document'])
+        index(recipes)
+
+
+def search(queryset, query):
+    '''
+    Рецепты, где есть все слова запроса, в том числе как начала слов.
+    Ищет по индексу: GIN в PostgreSQL, FTS5 в SQLite, в остальных
+    базах — перебором через icontains.
+    '''
+    words = re.findall(r'\w+', query)
+    if not words:
+        return queryset
+    if connection.vendor == 'postgresql':
+        terms = ' & '.join(f'{word}:*' for word in words)
+    elif connection.vendor == 'sqlite':
+        terms = ' '.join(f'"{word}"*' for word in words)
+    else:
+        for word in words:
+            queryset = queryset.filter(search_document__icontains=word)
+        return queryset
+    # Условие без аннотации: иначе Django 2.2 повторит его в SELECT
+    # и COUNT, и to_tsvector будет считаться для каждой найденной строки
+    return queryset.extra(
+        where=[SEARCH_SQL[connection.vendor]], params=[terms]
+    )
+
+
+@receiver(post_delete, sender=Recipes)
+def remove_from_index(instance, **kwargs):
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s', [instance.pk]
+            )
+
+
+@receiver(post_save, sender=Ingredients)
+def refresh_ingredient_recipes(instance, created, raw=False, **kwargs):
+    '''Переименованный ингредиент должен находиться по новому названию'''
+    if not created and not raw:
+        refresh(RecipeIngredients.objects.filter(
+            ingredient=instance
+        ).values_list('recipe', flat=True))
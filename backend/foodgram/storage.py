@@ -0,0 +1,79 @@
+import hashlib
+import os
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import Q
+from django.utils.deconstruct import deconstructible
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    '''
+    Файлы называются по sha256 содержимого: одинаковые загрузки
+    хранятся один раз, а файл по имени никогда не меняется, поэтому
+    nginx может кэшировать его навсегда. Файл удаляется, только когда
+    на него не ссылается ни один рецепт.
+
+    Сохранение и удаление блокируют строку FileLocks с именем файла
+    до конца транзакции. Удаление ждёт коммита рецепта, который
+    переиспользовал уже лежащий файл, и видит ссылку на него,
+    а сохранение после удаления записывает файл заново. Строка
+    удаляется вместе с файлом, так что таблица не растёт со временем.
+    '''
+
+    reference_fields = ('image', 'thumbnail', 'image_webp')
+
+    def content_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in iter(lambda: content.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        name = self.content_name(name, content)
+        with transaction.atomic(savepoint=False):
+            self.lock(name)
+            if self.exists(name):
+                return name
+            return super().save(name, content, max_length)
+
+    @property
+    def locks(self):
+        return apps.get_model('foodgram', 'FileLocks').objects
+
+    def lock(self, name):
+        '''
+        Блокирует строку с именем файла до конца транзакции. Строку,
+        удалённую вместе с файлом, пока ждали блокировку, заводит заново
+        '''
+        while True:
+            self.locks.insert_ignore(name=name)
+            if list(self.locks.select_for_update().filter(name=name)):
+                return
+
+    def references(self, name):
+        recipes = apps.get_model('foodgram', 'Recipes')
+        return recipes.objects.filter(Q(*(
+            (field, name) for field in self.reference_fields
+        ), _connector=Q.OR)).exists()
+
+    def delete(self, name):
+        with transaction.atomic(savepoint=False):
+            self.lock(name)
+            if not self.references(name):
+                super().delete(name)
+                self.locks.filter(name=name).raw_delete()
+
+
+content_storage = ContentAddressedStorage()
@@ -0,0 +1,76 @@
+'''
+Суммы корзины при изменениях в обход API: каскадные удаления
+рецептов и пользователей, админка, shell. API добавляет и удаляет
+связи запросами без сигналов и сдвигает суммы само.
+
+Суммы пересчитываются после удаления строки по тому, что осталось
+в базе. Поэтому при каскадном удалении рецепта разница вычитается
+ровно один раз: строки корзины и ингредиентов удаляются разными
+запросами, и вторые из них уже не находят первых.
+'''
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from foodgram.models import RecipeIngredients, ShopLists, ShopListTotals
+
+
+@receiver(pre_save, sender=ShopLists)
+@receiver(pre_save, sender=RecipeIngredients)
+def remember_previous(sender, instance, raw=False, **kwargs):
+    '''Прежнее состояние изменяемой строки, чтобы вычесть его'''
+    instance.previous = None
+    if instance.pk is not None and not raw:
+        instance.previous = sender.objects.filter(pk=instance.pk).first()
+
+
+def remove_from_cart(row):
+    ShopListTotals.objects.apply([row.user_id], {
+        ingredient: -amount for ingredient, amount in
+        ShopListTotals.objects.recipe_amounts(row.recipe_id).items()
+    })
+
+
+@receiver(post_save, sender=ShopLists)
+def shoplist_saved(instance, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, 'previous', None)
+    if previous is not None:
+        if (previous.user_id, previous.recipe_id) == (
+            instance.user_id, instance.recipe_id
+        ):
+            return
+        remove_from_cart(previous)
+    ShopListTotals.objects.apply(
+        [instance.user_id],
+        ShopListTotals.objects.recipe_amounts(instance.recipe_id)
+    )
+
+
+@receiver(post_delete, sender=ShopLists)
+def shoplist_deleted(instance, **kwargs):
+    remove_from_cart(instance)
+
+
+@receiver(post_save, sender=RecipeIngredients)
+def ingredient_saved(instance, raw=False, **kwargs):
+    if raw:
+        return
+    old_amounts = {}
+    previous = getattr(instance, 'previous', None)
+    if previous is not None:
+        if previous.recipe_id == instance.recipe_id:
+            old_amounts = {previous.ingredient_id: previous.amount}
+        else:
+            ingredient_deleted(previous)
+    ShopListTotals.objects.change_recipe(
+        instance.recipe_id, old_amounts,
+        {instance.ingredient_id: instance.amount}
+    )
+
+
+@receiver(post_delete, sender=RecipeIngredients)
+def ingredient_deleted(instance, **kwargs):
+    ShopListTotals.objects.change_recipe(
+        instance.recipe_id, {instance.ingredient_id: instance.amount}, {}
+    )
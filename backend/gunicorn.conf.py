@@ -0,0 +1,23 @@
+'''
+Настройки gunicorn, переопределяются переменными окружения.
+
+Синхронный воркер держит одно соединение с базой, и при
+DB_CONN_MAX_AGE > 0 оно переживает запросы. С GUNICORN_THREADS > 1
+воркер становится gthread, и соединений на воркер столько же,
+сколько потоков: число воркеров × потоков не должно превышать
+max_connections PostgreSQL или default_pool_size pgbouncer.
+При нескольких воркерах нужен общий кэш справочников, см. README.
+
+ASGI: gunicorn backend.asgi:application -c gunicorn.conf.py
+с GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker; соединений
+с базой на воркер столько, сколько ASGI_THREADS.
+'''
+import os
+
+bind = os.getenv('GUNICORN_BIND', default='0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', default=1))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', default='sync')
+threads = int(os.getenv('GUNICORN_THREADS', default=1))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', default=1000))
+max_requests_jitter = max_requests // 10
+timeout = int(os.getenv('GUNICORN_TIMEOUT', default=30))
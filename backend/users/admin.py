@@ -8,7 +8,7 @@ User = get_user_model()
 class UserAdmin(admin.ModelAdmin):
     list_display = (
         'pk', 'username', 'email',
-        'first_name', 'last_name',
+        'first_name', 'last_name', 'recipes_count', 'subscribers_count',
     )
     list_filter = ('username', 'email',)
     search_fields = ('^username', '^email',)
@@ -29,6 +29,12 @@ class User(AbstractUser):
     password = models.CharField(
         _('password'), max_length=settings.CHAR_LIMIT
     )
+    recipes_count = models.PositiveIntegerField(
+        'Число рецептов', default=0, editable=False
+    )
+    subscribers_count = models.PositiveIntegerField(
+        'Число подписчиков', default=0, editable=False
+    )
 
     class Meta:
         verbose_name = 'Пользователь'
@@ -37,6 +43,3 @@ class User(AbstractUser):
 
     def __str__(self):
         return self.username
-
-    def recipes_count(self):
-        return self.recipes.count()